@@ -1,6 +1,30 @@
 from ursina import *
+from panda3d.core import GeomVertexWriter, OmniBoundingVolume
+import atexit, os, sys, random, time as systime
 from math import sin, cos, radians
-import random, os, time as systime
+from camera_rig import CameraRig, RigProfile, CAMERA_MODES
+from vehicle_state import CarState, PlaneState, GRAVITY
+from level_layout import new_seed
+from scene_bake import load_level, baked_seeds, usable_cache
+from level_prefetch import LevelPrefetcher
+from leaderboard import Leaderboard
+from parking import ParkingBay, ParkingEvaluator, gauge
+from terrain import Heightfield
+from ccd import CarCollider, advance, reachable
+from bvh import BVH
+from trajectory import TrajectoryPredictor
+from wind import WindField
+from minimap import MinimapLayer
+from particles import ParticleSystem, ParticleEmitter
+from world_streaming import WorldStreamer, lot_barriers, LOT_WIDTH, LOT_DEPTH
+from timers import TimerWheel
+from diagnostics import Diagnostics, scene_probes, heap_probes, timer_probes
+from input_latency import InputLatency
+from game_state import StateMachine, PLAYING, CRASHED, PARKED, RESETTING
+from multiplayer import ThreadedClient
+from headless_sim import CRASHED as REMOTE_CRASHED, PARKED as REMOTE_PARKED
+from telemetry import (TelemetryRecorder, VEHICLE_CAR, VEHICLE_PLANE,
+                       EVENT_COLLISION, EVENT_PARKED, EVENT_LANDED, EVENT_RESET)
 
 app = Ursina()
 
@@ -19,6 +43,9 @@ WHEEL_COLOR = color.black
 OBSTACLE_COLOR = color.azure.tint(0.3)
 TEXT_COLOR = color.lime
 SPEED_TEXT_COLOR = color.orange
+TERRAIN_COLOR = color.olive
+AHEAD_PATH_COLOR = color.yellow
+BRAKE_PATH_COLOR = color.magenta
 
 # ===== Lighting =====
 DirectionalLight(y=3, z=5, shadows=True, rotation=(45, -30, 0))
@@ -26,24 +53,84 @@ AmbientLight(color=color.rgba(100, 100, 120, 0.4))
 
 # ===== Entities =====
 ground = Entity(model='plane', scale=(30,1,100), texture='white_cube',
-                texture_scale=(30,100), color=GROUND_COLOR, collider='box')
-
-# 🚧 Barriers on edges 🚧
-barriers = []
-barrier_thickness = 1
-barrier_height = 3
-barrier_z_length = 100
-barrier_x_length = 30
-
-# Left & Right
-barriers.append(Entity(model='cube', color=color.clear, scale=(barrier_thickness, barrier_height, barrier_z_length),
-                       position=(-barrier_x_length/2, barrier_height/2, 0), collider='box', visible=False))
-barriers.append(Entity(model='cube', color=color.clear, scale=(barrier_thickness, barrier_height, barrier_z_length),
-                       position=(barrier_x_length/2, barrier_height/2, 0), collider='box', visible=False))
-
-# Front only (no back!)
-barriers.append(Entity(model='cube', color=color.clear, scale=(barrier_x_length, barrier_height, barrier_thickness),
-                       position=(0, barrier_height/2, barrier_z_length/2), collider='box', visible=False))
+                texture_scale=(30,100), color=GROUND_COLOR)
+
+# 🚧 Barriers on edges: left, right and front only (no back!), with gates
+# through to the neighbouring lots 🚧. They are invisible and only collide,
+# so they exist as (centre, half extents) boxes for the car collider and BVH
+barrier_boxes = [(x, y, z, sx/2, sy/2, sz/2) for x, y, z, sx, sy, sz in lot_barriers(0, 0)]
+
+# Baked levels (see scene_bake.py) are read from here; misses are baked on the
+# spot, and the cache trims itself to the most recently used levels
+SCENE_CACHE = usable_cache(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scene_cache'))
+
+# ⛰ Terrain around the lot ⛰
+TERRAIN_SEED = 2024
+PLANE_CLEARANCE = 0.15
+PLANE_MIN_EXTENT = 0.5    # smallest obstacle half extent the plane can hit
+PLANE_REACH = 5           # farthest a hull box reaches from the plane's centre
+GROUND_HIT = 1 << 30      # collider index reported for terrain contact
+STREAMED_HIT = GROUND_HIT + 1   # ... and for a box of a streamed lot
+CAR_CLIMB = 0.3           # terrain past the city's edge higher than this stops the car
+LANDING_FLATNESS = 0.98   # minimum ground normal y for a landing
+
+class TerrainStreamer:
+    # Builds chunk meshes nearest-first, a few per frame, and drops the
+    # ones that fall out of range.
+    def __init__(self, field, load_radius=160, builds_per_frame=2):
+        self.field = field
+        self.load_radius, self.unload_radius = load_radius, load_radius + 40
+        self.builds_per_frame = builds_per_frame
+        cols, rows = field.chunk_grid()
+        self.centers = {(ci, cj): field.chunk_center(ci, cj) for ci in range(cols) for cj in range(rows)}
+        self.chunks = {}
+
+    def update(self, x, z):
+        wanted = []
+        for key, (cx, cz) in self.centers.items():
+            d = (cx-x)**2 + (cz-z)**2
+            if key in self.chunks:
+                if d > self.unload_radius**2:
+                    destroy(self.chunks.pop(key))
+            elif d < self.load_radius**2:
+                wanted.append((d, key))
+        wanted.sort()
+        for _, key in wanted[:self.builds_per_frame]:
+            vertices, triangles, normals, uvs = self.field.chunk_mesh_data(*key)
+            # Sunk a touch so the flat lot area doesn't z-fight the ground plane
+            self.chunks[key] = Entity(model=Mesh(vertices=vertices, triangles=triangles, normals=normals, uvs=uvs),
+                                      color=TERRAIN_COLOR, y=-0.02, double_sided=True)
+
+# 🏙 Neighbouring lots, built off-thread and streamed in around the player.
+# The city is (2*ni+1) x (2*nj+1) lots; the terrain is pressed flat under it,
+# so every lot sits at ground level and the car drives straight across 🏙
+WORLD_SEED = 7
+CITY_EXTENT = (3, 1)
+
+terrain_field = Heightfield.generate(TERRAIN_SEED,
+                                     flat_half_x=(CITY_EXTENT[0] + 0.5)*LOT_WIDTH + 2,
+                                     flat_half_z=(CITY_EXTENT[1] + 0.5)*LOT_DEPTH + 2)
+terrain = TerrainStreamer(terrain_field)
+
+def spawn_lot(chunk):
+    lot = Entity(position=(chunk.cx, 0, chunk.cz))
+    Entity(parent=lot, model='cube', scale=(LOT_WIDTH,4,LOT_DEPTH), y=-2.01, color=GROUND_COLOR)
+    Entity(parent=lot, model=Mesh(vertices=chunk.vertices, triangles=chunk.triangles, normals=chunk.normals),
+           color=OBSTACLE_COLOR, double_sided=True)
+    Entity(parent=lot, model='plane', scale=(3,1,4), color=PARKING_COLOR,
+           position=(chunk.parking_spot[0]-chunk.cx, 0.01, chunk.parking_spot[1]-chunk.cz))
+    return lot
+
+world = WorldStreamer(WORLD_SEED, spawn_lot, destroy, skip=[(0,0)], extent=CITY_EXTENT)
+atexit.register(world.close)
+
+def view_cast(view_tree):
+    # Camera occlusion ray against the level's view tree and the streamed lots
+    def cast(ox, oy, oz, dx, dy, dz, length):
+        hit = view_tree.raycast(ox, oy, oz, dx, dy, dz, length)
+        streamed = world.raycast(ox, oy, oz, dx, dy, dz, hit if hit >= 0 else length)
+        return streamed if streamed >= 0 else hit
+    return cast
 
 # ===== UI =====
 message = Text('', origin=(0,0), scale=2, y=0.4, color=TEXT_COLOR, background=True)
@@ -57,6 +144,8 @@ mode_text = Text('Mode: Car (Cam: Locked)', position=window.top_left + Vec2(0.1,
                  scale=1.2, color=color.cyan)
 zoom_text = Text('Zoom: 0', position=window.top_left + Vec2(0.1,-0.5),
                  scale=1.2, color=color.pink)
+park_text = Text('Park: --', position=window.top_left + Vec2(0.1,-0.6),
+                 scale=1.2, color=PARKING_COLOR)
 
 controls_text = Text(
     text=(
@@ -64,7 +153,8 @@ controls_text = Text(
         " Car: W/S = Forward/Back | A/D = Steer | B = Brake\n"
         " Plane: ↑/↓ = Throttle | W/S = Pitch | A/D = Yaw\n"
         " Camera: V = Toggle Cam | Q/E = Zoom\n"
-        " Misc: C = Switch Mode | R = Reset"
+        " Misc: C = Switch Mode | R = Reset | T = Trajectory\n"
+        " Debug: F3 = Diagnostics | F4 = Dump Diagnostics | F6 = Dump Input Latency"
     ),
     position=window.bottom_left + Vec2(0.1,0.1),
     origin=(-0.5,-0.5),
@@ -72,93 +162,160 @@ controls_text = Text(
     color=color.white
 )
 
+diag_text = Text('', position=window.top_right + Vec2(-0.4,-0.1), scale=1, color=color.white,
+                 background=True, enabled=False)
+
+# ===== Diagnostics =====
+diagnostics = Diagnostics({**scene_probes(scene, lambda: application.sequences, Text),
+                           **timer_probes(lambda: [manager.timers]), **heap_probes()})
+DIAGNOSTICS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'diagnostics')
+
+# ===== Input latency =====
+# Driving keys are followed from input() to the tick that uses them and the
+# frame that shows it; the session's histograms are written at exit or on F6.
+DRIVE_KEYS = ('w', 'a', 's', 'd', 'b', 'up arrow', 'down arrow')
+input_latency = InputLatency(DRIVE_KEYS, export_path=os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), 'latency', systime.strftime('latency-%Y%m%d-%H%M%S.json')))
+
+def mark_presented(task):
+    # Sorted after igLoop (50), so the frame has been submitted
+    input_latency.present()
+    return task.cont
+
+app.taskMgr.add(mark_presented, 'input-latency-present', sort=55)
+
+# ===== Camera =====
+camera_rig = CameraRig()
+
+# ===== Telemetry =====
+telemetry = TelemetryRecorder(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'telemetry',
+                                           systime.strftime('session-%Y%m%d-%H%M%S.tlm')))
+
+# ===== Dynamic meshes =====
+# Point / line meshes that change every frame get a dynamic vertex buffer
+# once and are rewritten in place through vertex writers, never regenerated.
+def dynamic_mesh(n, mode, thickness, colors=None):
+    mesh = Mesh(vertices=[(0,0,0)]*n, colors=colors or [(0,0,0,0)]*n, mode=mode,
+                thickness=thickness, static=False)
+    # Contents move anywhere, so skip bounds recomputation and culling
+    mesh.geomNode.setBounds(OmniBoundingVolume())
+    mesh.geomNode.setFinal(True)
+    return mesh
+
+def vertex_writers(mesh, *columns):
+    # Writers start at row 0 and advance one row per write
+    vdata = mesh.geomNode.modifyGeom(0).modifyVertexData()
+    return [GeomVertexWriter(vdata, column) for column in columns]
+
+# ===== Effects =====
+class ParticleMesh(Entity):
+    # One point mesh per emitter, sized to its capacity, whose dynamic
+    # vertex buffer is rewritten in place straight from the emitter arrays;
+    # slots past the live count are parked at alpha 0.
+    def __init__(self, emitter, start, end, size):
+        self.emitter = emitter
+        self.start, self.end = start, end
+        self.drawn = 0
+        super().__init__(model=dynamic_mesh(emitter.capacity, 'point', size))
+        self.set_transparency(True)
+
+    def refresh(self):
+        e = self.emitter
+        n = e.alive
+        if n == 0 and self.drawn == 0:
+            return
+        (r0, g0, b0, a0), (r1, g1, b1, a1) = self.start, self.end
+        dr, dg, db, da = r1-r0, g1-g0, b1-b0, a1-a0
+        inv = 1 / e.lifetime
+        x, y, z, age = e.x, e.y, e.z, e.age
+        vertex, rgba = vertex_writers(self.model, 'vertex', 'color')
+        for i in range(n):
+            t = age[i] * inv
+            vertex.setData3f(x[i], y[i], z[i])
+            rgba.setData4f(r0 + dr*t, g0 + dg*t, b0 + db*t, a0 + da*t)
+        for i in range(n, self.drawn):
+            rgba.setData4f(0, 0, 0, 0)
+        self.drawn = n
+
+particles = ParticleSystem(budget=512)
+particle_meshes = [
+    ParticleMesh(particles.add('sparks', ParticleEmitter(256, lifetime=0.6, gravity=GRAVITY, drag=1.5)),
+                 (1, 0.95, 0.4, 1), (1, 0.3, 0, 0), 6),
+    ParticleMesh(particles.add('exhaust', ParticleEmitter(128, lifetime=1.2, gravity=-0.6, drag=2)),
+                 (0.5, 0.5, 0.5, 0.6), (0.8, 0.8, 0.8, 0), 8),
+    ParticleMesh(particles.add('dust', ParticleEmitter(192, lifetime=0.8, gravity=0.5, drag=3)),
+                 (0.6, 0.5, 0.35, 0.7), (0.7, 0.6, 0.45, 0), 10),
+]
+
+def crash_sparks(x, y, z, vx, vz):
+    # Thrown back off the impact and up
+    particles.emit('sparks', 80, x, y, z, -0.3*vx, 3, -0.3*vz, spread=5)
+
 # ===== Classes =====
 class Car(Entity):
     def __init__(self):
         super().__init__(model='cube', color=CAR_COLOR, scale=(1,0.5,2),
-                         position=(0,0.25,-45), collider='box')
+                         position=(0,0.25,-45))
         for offset in [(-0.5,-0.25,0.8),(0.5,-0.25,0.8),
                        (-0.5,-0.25,-0.8),(0.5,-0.25,-0.8)]:
             Entity(parent=self, model='sphere', color=WHEEL_COLOR,
                    scale=0.2, position=offset)
-        self.velocity = Vec3(0,0,0)
-        self.target_rotation = 0
-        self.rotation_velocity = 0
-        # settings
-        self.accel, self.rev_accel = 4, 2
-        self.max_speed, self.max_rev = 9, 4.5
-        self.friction, self.rot_speed = 6, 60
+        self.state = CarState(spawn=(0,0.25,-45))
+        self.camera_profile = RigProfile(distance=8, height=4, orbit_radius=10, orbit_wobble=2,
+                                         orbit_height=6, height_wobble=3, orbit_period=25)
 
     def reset(self):
-        self.position = Vec3(0,0.25,-45)
-        self.rotation_y = 0
-        self.velocity = Vec3(0,0,0)
-        self.target_rotation = 0
-        self.rotation_velocity = 0
-
-    def update_move(self, dt, obstacles):
-        move_input = held_keys['w'] - held_keys['s']
-        angle_rad = radians(self.rotation_y)
-        forward = Vec3(sin(angle_rad),0,cos(angle_rad)).normalized()
-
-        steer_input = held_keys['d'] - held_keys['a']
-        steering_eff = min(self.velocity.length()/self.max_speed, 1)
-        self.rotation_velocity += steer_input * self.rot_speed * steering_eff * dt
-        self.rotation_velocity -= self.rotation_velocity * 3 * dt
-        self.target_rotation += self.rotation_velocity * dt
-        self.rotation_y = lerp_angle(self.rotation_y, self.target_rotation, 8*dt)
-
-        if move_input == 1:
-            self.velocity += forward * self.accel * dt
-        elif move_input == -1:
-            self.velocity += forward * -self.rev_accel * dt
-        else:
-            self.velocity -= self.velocity * min(self.friction*dt,1)
-
-        if held_keys['b']:
-            self.velocity -= self.velocity * min(12*dt,1)
-
-        if self.velocity.length() > self.max_speed and move_input == 1:
-            self.velocity = self.velocity.normalized() * self.max_speed
-        if self.velocity.length() > self.max_rev and move_input == -1:
-            self.velocity = self.velocity.normalized() * self.max_rev
-
-        self.velocity.y -= 9.8*dt
-        self.position += self.velocity*dt
-        if self.y < 0.25:
-            self.y = 0.25
-            self.velocity.y = 0
-
-        hit = self.intersects()
-        if hit.hit and hit.entity in obstacles:
-            return True
-        if hit.hit and hit.entity in barriers:
-            return True
-        return False
-
-    def update_camera(self, dt, mode, zoom):
-        angle_rad = radians(self.rotation_y)
-        forward = Vec3(sin(angle_rad),0,cos(angle_rad)).normalized()
-
-        if mode == 'locked':
-            cam_pos = self.position - forward*(8+zoom) + Vec3(0,4+zoom*0.5,0)
-            camera.position = cam_pos
-            camera.rotation = (20, self.rotation_y, 0)
-
-        elif mode == 'chase':
-            cam_target = self.position - forward*(8+zoom) + Vec3(0,4+zoom*0.5,0)
-            camera.position = lerp(camera.position, cam_target, 5*dt)
-            camera.rotation = (20, self.rotation_y, 0)
-
-        elif mode == 'cinematic':
-            t = systime.time()
-            orbit_radius = 10 + zoom + sin(t*0.7)*2
-            orbit_speed = 0.25 + 0.05*sin(t*0.3)
-            cam_x = self.x + orbit_radius * cos(t*orbit_speed)
-            cam_z = self.z + orbit_radius * sin(t*orbit_speed)
-            cam_y = self.y + 6 + sin(t*0.6)*3
-            camera.position = lerp(camera.position, Vec3(cam_x, cam_y, cam_z), 2*dt)
-            camera.look_at(self.position + Vec3(0,1,0))
+        self.state.reset()
+        self.state.sync(self)
+
+    def update_move(self, dt, collider):
+        move, steer, brake = held_keys['w'] - held_keys['s'], held_keys['d'] - held_keys['a'], held_keys['b']
+        s = self.state
+        self.inputs = (move, steer, brake)
+        # Substepped and swept, so a long frame can't tunnel through an obstacle
+        index, toi = advance(s, lambda h: s.step(move, steer, brake, h), lambda: self.collides(collider),
+                             dt, s.speed() + s.accel*dt, collider.min_extent)
+        s.sync(self)
+
+        crashed = index >= 0
+        self.impact = (index, toi) if crashed else None
+        t = systime.time() + (toi - dt if crashed else 0)
+        telemetry.record(t, VEHICLE_CAR, s.x, s.y, s.z, s.heading, 0, s.vx, s.vy, s.vz,
+                         move, steer, brake, EVENT_COLLISION if crashed else 0)
+        return crashed
+
+    def collides(self, collider):
+        # This level, then the streamed lots, then the hills past the city
+        s = self.state
+        index = collider.hit(s)
+        if index >= 0:
+            return index
+        if world.car_hit(s) >= 0:
+            return STREAMED_HIT
+        if terrain_field.height(s.x, s.z) > CAR_CLIMB:
+            return GROUND_HIT
+        return -1
+
+    def emit_effects(self, dt):
+        move, steer, brake = self.inputs
+        s = self.state
+        fx, fz = sin(radians(s.heading)), cos(radians(s.heading))
+        rear_x, rear_z = s.x - fx, s.z - fz
+        if move == 1:
+            particles.emit_rate('exhaust', 25, dt, rear_x, 0.2, rear_z, -fx*0.5, 0.4, -fz*0.5, spread=0.3)
+        speed = s.speed()
+        if speed > 3 and (steer or brake):
+            # Tyre dust off both rear wheels
+            rate = 20 * min(speed / s.max_speed, 1)
+            for side in (-0.5, 0.5):
+                particles.emit_rate('dust', rate, dt, rear_x + fz*side, 0.05, rear_z - fx*side,
+                                    -s.vx*0.2, 0.6, -s.vz*0.2, spread=0.6)
+
+    def update_camera(self, dt, mode, zoom, view_tree):
+        s = self.state
+        camera_rig.update(dt, self.camera_profile, mode, s.x, s.y, s.z, s.heading, zoom)
+        camera_rig.avoid_occlusion(dt, s.x, s.y + self.camera_profile.look_height, s.z, view_cast(view_tree))
+        camera_rig.apply(camera)
 
 class Plane(Entity):
     def __init__(self):
@@ -168,104 +325,239 @@ class Plane(Entity):
                position=(0,0,0))
         Entity(parent=self, model='cube', color=color.white, scale=(1.5,0.1,0.8),
                position=(0,0,-1.2))
-        self.velocity = Vec3(0,0,0)
-        self.accel, self.max_speed, self.friction = 5, 15, 1.5
+        self.state = PlaneState(spawn=(0,5,-45))
+        self.wind = None        # the level's WindField, set with each level
+        self.wind_time = 0.0
+        self.camera_profile = RigProfile(distance=15, height=5, orbit_radius=18, orbit_wobble=3,
+                                         orbit_height=8, height_wobble=4, orbit_period=30,
+                                         world_offset=True)
 
     def reset(self):
-        self.position = Vec3(0,5,-45)
-        self.rotation = Vec3(0,0,0)
-        self.velocity = Vec3(0,0,0)
-
-    def update_move(self, dt, obstacles):
-        move_input = held_keys['up arrow'] - held_keys['down arrow']
-        forward = self.forward
-        if move_input != 0:
-            self.velocity += forward * self.accel * move_input * dt
+        self.state.reset()
+        self.state.sync(self)
+        self.wind_time = 0.0
+
+    def collides(self):
+        s = self.state
+        if s.y - terrain_field.height(s.x, s.z) < PLANE_CLEARANCE:
+            return GROUND_HIT
+        hull = s.hull()
+        index = self.collision_tree.query_hull(hull)
+        if index < 0 and world.plane_hit(s.x, s.z, hull, PLANE_REACH) >= 0:
+            return STREAMED_HIT
+        return index
+
+    def update_move(self, dt, collision_tree):
+        throttle = held_keys['up arrow'] - held_keys['down arrow']
+        pitch, yaw = held_keys['w'] - held_keys['s'], held_keys['a'] - held_keys['d']
+        s = self.state
+        self.collision_tree = collision_tree
+        # Wind is sampled once per tick and held through the swept step
+        s.wx, s.wy, s.wz = self.wind.sample(s.x, s.y, s.z, self.wind_time)
+        self.wind_time += dt
+        index, toi = advance(s, lambda h: s.step(throttle, pitch, yaw, h), self.collides,
+                             dt, s.speed() + s.accel*dt + s.wind_speed(), PLANE_MIN_EXTENT)
+        s.sync(self)
+
+        crashed = index >= 0
+        self.impact = (index, toi) if crashed else None
+        t = systime.time() + (toi - dt if crashed else 0)
+        telemetry.record(t, VEHICLE_PLANE, s.x, s.y, s.z, s.yaw, s.pitch, s.vx, s.vy, s.vz,
+                         throttle, pitch, yaw, EVENT_COLLISION if crashed else 0)
+        return crashed
+
+    def update_camera(self, dt, mode, zoom, view_tree):
+        s = self.state
+        camera_rig.update(dt, self.camera_profile, mode, s.x, s.y, s.z, s.yaw, zoom)
+        camera_rig.avoid_occlusion(dt, s.x, s.y + self.camera_profile.look_height, s.z, view_cast(view_tree))
+        camera_rig.apply(camera)
+
+class TrajectoryOverlay(Entity):
+    # Braking path and held-input path as one line strip through the car:
+    # stop point -> car -> two seconds ahead. The vertex count is fixed, the
+    # braking half is padded with its stop point, so the dynamic buffer is
+    # only rewritten, and only when the car or its inputs changed.
+    def __init__(self):
+        self.predictor = TrajectoryPredictor()
+        n = self.predictor.count
+        colors = [BRAKE_PATH_COLOR]*(n-1) + [AHEAD_PATH_COLOR]*n
+        super().__init__(model=dynamic_mesh(2*n - 1, 'line', 3, colors))
+        self.shown = None
+        self.enabled = False
+
+    def show(self, state, move, steer, brake):
+        key = (state.x, state.z, state.heading, state.vx, state.vz, state.rotation_velocity, move, steer, brake)
+        if key == self.shown:
+            return
+        self.shown = key
+        p = self.predictor.predict(state, move, steer, brake)
+        n, ahead, path = p.count, p.ahead, p.brake
+        vertex, = vertex_writers(self.model, 'vertex')
+        for i in range(n-1, -1, -1):
+            o = min(i, p.stop)*3
+            vertex.setData3f(path[o], path[o+1]-0.2, path[o+2])
+        for i in range(1, n):
+            o = i*3
+            vertex.setData3f(ahead[o], ahead[o+1]-0.2, ahead[o+2])
+
+class Minimap(Entity):
+    # Lot, barriers, obstacles and bays rasterised once per level into a
+    # texture; each frame only the vehicle marker moves over it. The marker
+    # lives straight on camera.ui so the map's scale doesn't skew it.
+    def __init__(self):
+        super().__init__(parent=camera.ui, model='quad', scale=(0.093,0.3),
+                         position=window.bottom_right + Vec2(-0.08,0.2), z=0)
+        self.marker = Entity(parent=camera.ui, model='quad', color=CAR_COLOR, scale=(0.01,0.02), z=-0.01)
+        self.layer = None
+
+    def bake(self, manager):
+        layer = MinimapLayer(-15.5, -50, 15.5, 50.5, pixels_per_unit=3, background=(30,30,30,200))
+        layer.rect(0, 0, 15, 50, (120,120,120,255))
+        for b in barrier_boxes:
+            layer.rect(b[0], b[2], b[3], b[5], (40,40,40,255))
+        if manager.plane_mode:
+            layer.rect(0, 50, 3, 3, (60,200,60,255))
+            for x, _, z in manager.level.plane_obstacles:
+                layer.circle(x, z, 0.5, (90,160,255,255))
         else:
-            self.velocity -= self.velocity * min(self.friction*dt,1)
-        if self.velocity.length() > self.max_speed:
-            self.velocity = self.velocity.normalized() * self.max_speed
-
-        self.rotation_x += (held_keys['w']-held_keys['s'])*30*dt
-        self.rotation_y += (held_keys['a']-held_keys['d'])*30*dt
-
-        self.position += self.velocity*dt
-
-        for ob in obstacles + barriers:
-            if self.intersects(ob).hit:
-                return True
+            layer.polygon(manager.parking_eval.bay.corners, (60,200,60,255))
+            for x, _, z in manager.level.car_obstacles:
+                layer.rect(x, z, 0.5, 0.5, (90,160,255,255))
+        self.layer = layer
+        self.texture = Texture(layer.image())
+        self.texture.filtering = None
+        self.marker.color = color.white if manager.plane_mode else CAR_COLOR
+
+    def track(self, x, z, heading):
+        u, v = self.layer.uv(x, z)
+        self.marker.x = self.x + u*self.scale_x
+        self.marker.y = self.y + v*self.scale_y
+        self.marker.rotation_z = heading
+
+# ===== Level staging =====
+# Runs on the prefetch worker: everything a level needs except the Mesh
+# objects themselves, which are made when the level is swapped in.
+CAR_SPAWN, CAR_BAY = (0,0.25,-45), (0,0.25,45)
+FALLBACK_SEED = 1    # checked playable; used when prefetching fails
+
+def stage_level(seed):
+    # Level, car collider, one camera-occlusion tree per mode holding only
+    # what is visible in it (the barriers are invisible, so they never block)
+    # and the level's wind. Streamed lots are cast against separately
+    # (view_cast), since they come and go while the level is played.
+    level = load_level(seed, barrier_boxes, SCENE_CACHE)
+    car_view = BVH(boxes=[(x, y, z, 0.5, 0.5, 0.5) for x, y, z in level.car_obstacles])
+    plane_view = BVH(spheres=[(x, y, z, 0.5) for x, y, z in level.plane_obstacles])
+    collider = CarCollider(level.colliders, half_width=0.5, half_length=1.0)
+    return level, collider, car_view, plane_view, WindField(seed, ground=terrain_field.height)
+
+LOT_INSIDE = (-LOT_WIDTH/2 + 1, -LOT_DEPTH/2 + 1, LOT_WIDTH/2 - 1, LOT_DEPTH/2 - 1)
+
+def level_is_playable(staged):
+    # The spawn and the parking bay must be clear of every collider, and
+    # the bay reachable from the spawn without leaving the lot
+    collider = staged[1]
+    if collider.hit(CarState(spawn=CAR_SPAWN)) >= 0 or collider.hit(CarState(spawn=CAR_BAY)) >= 0:
         return False
-
-    def update_camera(self, dt, mode, zoom):
-        if mode == 'locked':
-            cam_pos = self.position + Vec3(0,5+zoom*0.5,-15-zoom)
-            camera.position = cam_pos
-            camera.rotation = (20, 0, 0)
-
-        elif mode == 'chase':
-            cam_target = self.position + Vec3(0,5+zoom*0.5,-15-zoom)
-            camera.position = lerp(camera.position, cam_target, 5*dt)
-            camera.rotation = (20, 0, 0)
-
-        elif mode == 'cinematic':
-            t = systime.time()
-            orbit_radius = 18 + zoom + cos(t*0.8)*3
-            orbit_speed = 0.2 + 0.05*cos(t*0.4)
-            cam_x = self.x + orbit_radius * cos(t*orbit_speed)
-            cam_z = self.z + orbit_radius * sin(t*orbit_speed)
-            cam_y = self.y + 8 + cos(t*0.5)*4
-            camera.position = lerp(camera.position, Vec3(cam_x, cam_y, cam_z), 2*dt)
-            camera.look_at(self.position + Vec3(0,1,0))
+    return reachable(collider, (CAR_SPAWN[0], CAR_SPAWN[2]), (CAR_BAY[0], CAR_BAY[2]), LOT_INSIDE)
 
 # ===== GameManager =====
 class GameManager:
-    def __init__(self):
+    def __init__(self, remote=None):
+        # remote: a ThreadedClient when joined to a multiplayer.py server
+        self.remote = remote
+        self.remote_cars = {}
         self.car = Car()
         self.plane = Plane()
         self.parking_spot = Entity(model='plane', scale=(3,1,4), color=PARKING_COLOR, position=(0,0,45))
-        self.parking_box = Entity(model='cube', scale=(2.8,0.5,3.8),
-                                  position=(0,0.25,45), collider='box', visible=False)
-        self.obstacles = []
+        self.parking_eval = ParkingEvaluator(ParkingBay.rectangle(0, 45, 3, 4), car_width=1, car_length=2)
+        # One merged-mesh entity per obstacle set; a new level only swaps their models
+        self.obstacles = [Entity(color=OBSTACLE_COLOR, double_sided=True)]
         self.plane_parking = Entity(model='plane', scale=(6,1,6), color=PARKING_COLOR,
                                     position=(0,0,50), collider='box', visible=False)
-        self.plane_obstacles = []
+        self.plane_obstacles = [Entity(color=color.azure, double_sided=True, visible=False)]
         self.plane_mode = False
         self.camera_mode = 'locked'
         self.start_time = systime.time()
-        self.best_time = None
+        self.leaderboard = Leaderboard(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'leaderboard.db'))
+        self.best_times = {mode: self.leaderboard.personal_best(mode) for mode in ('car', 'plane')}
+        self.timers = TimerWheel()
+        self.state = StateMachine(RESETTING)
+        self.level_seed = None
+        self.level_pool = baked_seeds(SCENE_CACHE, barrier_boxes)
         self.zoom = 0
-        self.generate_obstacles()
-
-    def generate_obstacles(self):
-        # Clear old ones
-        for o in self.obstacles: destroy(o)
-        for o in self.plane_obstacles: destroy(o)
-        self.obstacles.clear()
-        self.plane_obstacles.clear()
-
-        # Car obstacles arranged in rows forcing path
-        for z in range(-40, 40, 10):
-            gap_x = random.choice([-4, -2, 0, 2, 4])  # random gap
-            for x in [-4, -2, 0, 2, 4]:
-                if x != gap_x:
-                    self.obstacles.append(Entity(model='cube', color=OBSTACLE_COLOR, scale=(1,1,1),
-                                                 position=(x,0.5,z), collider='box'))
-
-        # Plane obstacles randomized in air
-        for _ in range(10):
-            self.plane_obstacles.append(Entity(model='sphere', color=color.azure, scale=1,
-                                               position=(random.uniform(-10,10),random.uniform(2,8),
-                                                         random.uniform(-30,40)), collider='box', visible=False))
+        self.trajectory = TrajectoryOverlay()
+        self.minimap = Minimap()
+        self.show_trajectory = False
+        self.prefetch = None if remote else LevelPrefetcher(stage_level, pick_seed=self.pick_seed,
+                                                            validate=level_is_playable,
+                                                            fallback=FALLBACK_SEED)
+        self.generate_obstacles(remote.seed if remote else None)
+        if remote:
+            self.car.visible = False
+
+    def pick_seed(self):
+        # Called from the prefetch worker
+        return random.choice(self.level_pool) if self.level_pool else new_seed()
+
+    def generate_obstacles(self, seed=None):
+        # The prefetched level unless a specific seed is asked for
+        level, collider, self.car_view, self.plane_view, self.plane.wind = (
+            self.prefetch.take() if seed is None else stage_level(seed))
+        self.level = level
+        self.level_seed = level.seed
+
+        vertices, triangles, normals = level.car_mesh
+        self.obstacles[0].model = Mesh(vertices=vertices, triangles=triangles, normals=normals)
+        vertices, triangles, normals = level.plane_mesh
+        self.plane_obstacles[0].model = Mesh(vertices=vertices, triangles=triangles, normals=normals)
+        self.car_collider = collider
+        self.plane_tree = level.plane_tree
+        self.minimap.bake(self)
+
+    def mode_key(self):
+        return 'plane' if self.plane_mode else 'car'
+
+    def crash(self):
+        if not self.state.enter(CRASHED):
+            return
+        message.text = '💥 Crash!'
+        s = self.plane.state if self.plane_mode else self.car.state
+        crash_sparks(s.x, s.y, s.z, s.vx, s.vz)
+        self.timers.schedule('reset', 2, self.reset)
+
+    def finish_run(self, text):
+        if not self.state.enter(PARKED):
+            return
+        message.text = text
+        mode = self.mode_key()
+        telemetry.mark(EVENT_LANDED if self.plane_mode else EVENT_PARKED)
+        t = systime.time()-self.start_time
+        self.leaderboard.record(self.level_seed, mode, t)
+        if self.best_times[mode] is None or t<self.best_times[mode]:
+            self.best_times[mode] = t
+        best_time_text.text = f"Best: {self.best_times[mode]:.1f}"
+        self.timers.schedule('reset', 3, self.reset)
 
     def reset(self):
+        self.timers.cancel('reset')
+        self.state.enter(RESETTING)
         message.text = ''
         self.start_time = systime.time()
-        self.generate_obstacles()
+        park_text.text = 'Park: --'
+        telemetry.mark(EVENT_RESET)
+        best = self.best_times[self.mode_key()]
+        best_time_text.text = f"Best: {best:.1f}" if best is not None else 'Best: --'
+        self.generate_obstacles(self.remote.seed if self.remote else None)
+        camera_rig.snap()
         if self.plane_mode:
             self.plane.reset()
         else:
             self.car.reset()
             self.parking_spot.color = PARKING_COLOR
+        self.state.enter(PLAYING)
+        if diag_text.enabled:
+            diagnostics.checkpoint('reset', full=True)
 
     def toggle_mode(self):
         self.plane_mode = not self.plane_mode
@@ -286,63 +578,134 @@ class GameManager:
         self.reset()
 
     def toggle_camera_mode(self):
-        modes = ['locked','chase','cinematic']
-        idx = modes.index(self.camera_mode)
-        self.camera_mode = modes[(idx+1)%len(modes)]
-
-    def is_car_parked(self):
-        hit = self.car.intersects()
-        if hit.hit and hit.entity == self.parking_box:
-            ang = self.car.rotation_y % 360
-            return abs(ang-0)<15 or abs(ang-360)<15
-        return False
+        idx = CAMERA_MODES.index(self.camera_mode)
+        self.camera_mode = CAMERA_MODES[(idx+1)%len(CAMERA_MODES)]
+
+    def update_camera(self, dt):
+        if self.plane_mode:
+            self.plane.update_camera(dt, self.camera_mode, self.zoom, self.plane_view)
+        else:
+            self.car.update_camera(dt, self.camera_mode, self.zoom, self.car_view)
+
+    def parking_score(self):
+        s = self.car.state
+        score = self.parking_eval.evaluate(s.x, s.z, s.heading, s.speed())
+        park_text.text = f'Park: {gauge(score.total)} {int(score.total*100)}%'
+        return score
 
     def update(self):
         dt = time.dt
+        self.timers.advance(dt)
+        particles.step(dt)
+        for m in particle_meshes: m.refresh()
+        if diagnostics.update(dt, diag_text.enabled):
+            diag_text.text = diagnostics.format()
         elapsed = systime.time()-self.start_time
         timer_text.text = f'Time: {elapsed:.1f}'
         mode_text.text = f"Mode: {'Plane' if self.plane_mode else 'Car'} (Cam: {self.camera_mode.title()})"
         zoom_text.text = f"Zoom: {self.zoom}"
+        if self.remote:
+            # Inputs go to the server, not the local tick, so they're never consumed here
+            input_latency.discard()
+            self.update_remote(dt)
+            return
+
+        vehicle = self.plane.state if self.plane_mode else self.car.state
+        self.minimap.track(vehicle.x, vehicle.z, vehicle.yaw if self.plane_mode else vehicle.heading)
+        terrain.update(vehicle.x, vehicle.z)
+        world.update(vehicle.x, vehicle.z)
+
+        overlay = self.show_trajectory and not self.plane_mode and self.state.state == PLAYING
+        if self.trajectory.enabled != overlay:
+            self.trajectory.enabled = overlay
+
+        input_latency.poll(held_keys)
+        if self.state.state != PLAYING:
+            # Crashed or parked: hold the vehicle until the scheduled reset
+            input_latency.discard()
+            self.update_camera(dt)
+            return
 
         if not self.plane_mode:
-            crashed = self.car.update_move(dt, self.obstacles)
-            self.car.update_camera(dt, self.camera_mode, self.zoom)
+            crashed = self.car.update_move(dt, self.car_collider)
+            input_latency.tick()
+            self.update_camera(dt)
             if crashed:
-                message.text = '💥 Crash!'
-                invoke(self.reset, delay=2)
+                self.crash()
                 return
-            if self.is_car_parked():
-                message.text = '✅ Perfect Parking!'
-                t = systime.time()-self.start_time
-                if self.best_time is None or t<self.best_time:
-                    self.best_time = t
-                best_time_text.text = f"Best: {self.best_time:.1f}"
-                invoke(self.reset, delay=3)
+            self.car.emit_effects(dt)
+            if overlay:
+                self.trajectory.show(self.car.state, *self.car.inputs)
+            if self.parking_score().parked:
+                self.finish_run('✅ Perfect Parking!')
         else:
-            crashed = self.plane.update_move(dt, self.plane_obstacles)
-            self.plane.update_camera(dt, self.camera_mode, self.zoom)
+            crashed = self.plane.update_move(dt, self.plane_tree)
+            input_latency.tick()
+            self.update_camera(dt)
             if crashed:
-                message.text = '💥 Crash!'
-                invoke(self.reset, delay=2)
+                self.crash()
                 return
+            s = self.plane.state
             if self.plane.intersects(self.plane_parking).hit:
-                if self.plane.velocity.length()<2 and self.plane.y<1.5:
-                    message.text = '✅ Perfect Landing!'
-                    t = systime.time()-self.start_time
-                    if self.best_time is None or t<self.best_time:
-                        self.best_time = t
-                    best_time_text.text = f"Best: {self.best_time:.1f}"
-                    invoke(self.reset, delay=3)
+                altitude = s.y - terrain_field.height(s.x, s.z)
+                if s.speed()<2 and altitude<1.5 and terrain_field.normal(s.x, s.z)[1] > LANDING_FLATNESS:
+                    self.finish_run('✅ Perfect Landing!')
                 else:
                     message.text = '⚠ Too fast!'
-        speed_text.text = f'Speed: {int((self.plane.velocity if self.plane_mode else self.car.velocity).length()*10)} km/h'
-
-manager = GameManager()
+        speed_text.text = f'Speed: {int(vehicle.speed()*10)} km/h'
+
+    def update_remote(self, dt):
+        # The server simulates every car: only held inputs go out, and all
+        # cars, this one included, are drawn from interpolated snapshots.
+        self.remote.send_input(held_keys['w'] - held_keys['s'], held_keys['d'] - held_keys['a'], held_keys['b'])
+        cars = self.remote.sample()
+        for pid in [p for p in self.remote_cars if p not in cars]:
+            destroy(self.remote_cars.pop(pid))
+        for pid, (x, y, z, heading, status) in cars.items():
+            e = self.remote_cars.get(pid)
+            if e is None:
+                mine = pid == self.remote.player_id
+                e = self.remote_cars[pid] = Entity(model='cube', scale=(1,0.5,2),
+                                                   color=CAR_COLOR if mine else REMOTE_CAR_COLOR)
+            e.position = (x, y, z)
+            e.rotation_y = heading
+        me = cars.get(self.remote.player_id)
+        if me is None:
+            return
+        x, y, z, heading, status = me
+        self.minimap.track(x, z, heading)
+        camera_rig.update(dt, self.car.camera_profile, self.camera_mode, x, y, z, heading, self.zoom)
+        camera_rig.avoid_occlusion(dt, x, y + self.car.camera_profile.look_height, z, view_cast(self.car_view))
+        camera_rig.apply(camera)
+        message.text = REMOTE_MESSAGES.get(status, '')
+
+# 🌐 python "Car Game.py" --connect=host:port joins a multiplayer.py server 🌐
+REMOTE_CAR_COLOR = color.orange
+REMOTE_MESSAGES = {REMOTE_CRASHED: '💥 Crash!', REMOTE_PARKED: '✅ Perfect Parking!'}
+server = next((a.split('=', 1)[1] for a in sys.argv[1:] if a.startswith('--connect=')), None)
+if server:
+    host, _, port = server.rpartition(':')
+    manager = GameManager(ThreadedClient(host, int(port)))
+else:
+    manager = GameManager()
 
 def input(key):
+    input_latency.key_event(key)
+    if manager.remote and key in ('r', 'c', 't'):
+        return      # resets and mode are the server's
     if key=='r': manager.reset()
     if key=='c': manager.toggle_mode()
     if key=='v': manager.toggle_camera_mode()
+    if key=='t': manager.show_trajectory = not manager.show_trajectory
+    if key=='f3':
+        diag_text.enabled = not diag_text.enabled
+        if diag_text.enabled:
+            diagnostics.sample(full=True)
+            diag_text.text = diagnostics.format()
+    if key=='f4':
+        print('Diagnostics written to', diagnostics.dump(os.path.join(DIAGNOSTICS_DIR, systime.strftime('diag-%Y%m%d-%H%M%S.json'))))
+    if key=='f6':
+        print('Input latency written to', input_latency.export())
     if key=='q': manager.zoom = clamp(manager.zoom-1, -3, 15)
     if key=='e': manager.zoom = clamp(manager.zoom+1, -3, 15)
 
@@ -0,0 +1,130 @@
+# ==========================
+# BAY INDEX
+# Uniform grid over a lot's parking bays with a free count per cell, so
+# "nearest free bay" is a ring search that skips full cells and "bays in
+# the view cone" only visits cells the cone's range can reach. Occupancy
+# is flipped one bay at a time as cars come and go.
+# ==========================
+
+from array import array
+from math import sin, cos, radians, sqrt, atan2, degrees, floor, inf
+
+from parking import ParkingBay
+
+
+def bay_row(x0, cz, count, width, length, heading=0, both_ways=False):
+    # `count` side-by-side bays starting at x0 (left edge), centred on cz.
+    return [ParkingBay.rectangle(x0 + width*(i + 0.5), cz, width, length, heading, both_ways)
+            for i in range(count)]
+
+
+class BayIndex:
+    def __init__(self, bays, cell_size=None):
+        self.bays = list(bays)
+        n = len(self.bays)
+        self.x = array('d', [b.cx for b in self.bays])
+        self.z = array('d', [b.cz for b in self.bays])
+        self.free = bytearray(b'\x01') * n
+        self.free_total = n
+        # About four bays per cell by default
+        if cell_size is None:
+            spread = max(max(self.x) - min(self.x), max(self.z) - min(self.z), 1) if n else 1
+            cell_size = max(spread / max(sqrt(n / 4), 1), 1e-3)
+        self.cell = cell_size
+        self.cells = {}         # (i, j) -> [bay ids]
+        self.cell_free = {}     # (i, j) -> free bays in the cell
+        for b in range(n):
+            key = self._key(self.x[b], self.z[b])
+            self.cells.setdefault(key, []).append(b)
+            self.cell_free[key] = self.cell_free.get(key, 0) + 1
+        keys = self.cells.keys() or [(0, 0)]
+        self.i0, self.i1 = min(k[0] for k in keys), max(k[0] for k in keys)
+        self.j0, self.j1 = min(k[1] for k in keys), max(k[1] for k in keys)
+        # How far a bay outline can reach past its centre, for bay_at()
+        self.reach = max((max(abs(cx - b.cx) + abs(cz - b.cz) for cx, cz in b.corners) for b in self.bays),
+                         default=0)
+
+    def _key(self, x, z):
+        return floor(x / self.cell), floor(z / self.cell)
+
+    # ===== Occupancy =====
+    def set_free(self, b, free):
+        free = 1 if free else 0
+        if self.free[b] == free:
+            return
+        self.free[b] = free
+        delta = 1 if free else -1
+        self.free_total += delta
+        key = self._key(self.x[b], self.z[b])
+        self.cell_free[key] += delta
+
+    def bay_at(self, x, z):
+        # Index of the bay whose outline contains (x, z), or -1.
+        r = int(self.reach / self.cell) + 1
+        ci, cj = self._key(x, z)
+        for i in range(ci - r, ci + r + 1):
+            for j in range(cj - r, cj + r + 1):
+                for b in self.cells.get((i, j), ()):
+                    if all(nx*x + nz*z - d <= 0 for nx, nz, d in self.bays[b].edges):
+                        return b
+        return -1
+
+    # ===== Queries =====
+    def nearest_free(self, x, z, max_distance=inf):
+        # Ring search outwards; ring r can't hold anything closer than
+        # (r - 1) cells, so it stops as soon as that exceeds the best hit.
+        if not self.free_total:
+            return -1
+        ci, cj = self._key(x, z)
+        best, best_d2 = -1, max_distance * max_distance
+        cells, cell_free, xs, zs, free = self.cells, self.cell_free, self.x, self.z, self.free
+        rings = max(abs(ci - self.i0), abs(ci - self.i1), abs(cj - self.j0), abs(cj - self.j1))
+        for r in range(rings + 1):
+            near = (r - 1) * self.cell
+            if near > 0 and near*near >= best_d2:
+                break
+            for i in range(ci - r, ci + r + 1):
+                step = 1 if abs(i - ci) == r else 2*r or 1
+                for j in range(cj - r, cj + r + 1, step):
+                    if not cell_free.get((i, j)):
+                        continue
+                    for b in cells[(i, j)]:
+                        if free[b]:
+                            dx, dz = xs[b] - x, zs[b] - z
+                            d2 = dx*dx + dz*dz
+                            if d2 < best_d2:
+                                best, best_d2 = b, d2
+        return best
+
+    def in_cone(self, x, z, heading, half_angle, max_distance, free_only=True):
+        # Bays whose centre is within max_distance and half_angle degrees
+        # of `heading` (0 = +z, clockwise), nearest first.
+        i0, j0 = self._key(x - max_distance, z - max_distance)
+        i1, j1 = self._key(x + max_distance, z + max_distance)
+        i0, i1 = max(i0, self.i0), min(i1, self.i1)
+        j0, j1 = max(j0, self.j0), min(j1, self.j1)
+        a = radians(heading)
+        fx, fz = sin(a), cos(a)
+        cos_half = cos(radians(half_angle))
+        r2 = max_distance * max_distance
+        found = []
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                if free_only and not self.cell_free.get((i, j)):
+                    continue
+                for b in self.cells.get((i, j), ()):
+                    if free_only and not self.free[b]:
+                        continue
+                    dx, dz = self.x[b] - x, self.z[b] - z
+                    d2 = dx*dx + dz*dz
+                    if d2 > r2:
+                        continue
+                    if d2 > 0 and (dx*fx + dz*fz) < cos_half * sqrt(d2):
+                        continue
+                    found.append((d2, b))
+        found.sort()
+        return [b for _, b in found]
+
+    def bearing(self, b, x, z):
+        # Heading from (x, z) to bay b, in the same convention as the cars.
+        return degrees(atan2(self.x[b] - x, self.z[b] - z)) % 360
@@ -0,0 +1,155 @@
+# ==========================
+# BVH
+# Static bounding volume hierarchy over the plane-mode colliders: spheres
+# for airborne obstacles and axis aligned boxes for barriers. Queries take
+# the plane's hull as a set of oriented boxes and only run the exact
+# sphere-vs-OBB / box-vs-OBB tests at leaves whose bounds overlap.
+# ==========================
+
+from array import array
+
+from geometry import (sphere_overlaps_obb, obb_overlaps_aabb, obb_bounds,
+                      ray_box, ray_sphere, inverse_direction)
+
+LEAF_SIZE = 4
+SPHERE, BOX = 0, 1
+NODE_ARRAYS = ('lo', 'hi', 'left', 'right', 'start', 'count', 'order')
+
+
+class BVH:
+    def __init__(self, spheres=(), boxes=()):
+        # spheres: (x, y, z, radius); boxes: (x, y, z, half x, half y, half z)
+        self.prims = [(SPHERE, s) for s in spheres] + [(BOX, b) for b in boxes]
+        n = len(self.prims)
+        self.lo = array('d')        # node bounds, 3 per node
+        self.hi = array('d')
+        self.left = array('i')      # child index, or -1 for a leaf
+        self.right = array('i')
+        self.start = array('i')     # leaf range into self.order
+        self.count = array('i')
+        self.order = array('i', range(n))
+        self._bounds = [self._prim_bounds(p) for p in self.prims]
+        if n:
+            self._build(0, n)
+
+    @classmethod
+    def from_arrays(cls, spheres, boxes, nodes):
+        # Rebuilds a baked tree without re-sorting; nodes maps each name in
+        # NODE_ARRAYS to the array saved from an earlier build.
+        tree = cls.__new__(cls)
+        tree.prims = [(SPHERE, s) for s in spheres] + [(BOX, b) for b in boxes]
+        for name in NODE_ARRAYS:
+            setattr(tree, name, nodes[name])
+        return tree
+
+    @staticmethod
+    def _prim_bounds(prim):
+        kind, p = prim
+        if kind == SPHERE:
+            x, y, z, r = p
+            return (x-r, y-r, z-r, x+r, y+r, z+r)
+        x, y, z, hx, hy, hz = p
+        return (x-hx, y-hy, z-hz, x+hx, y+hy, z+hz)
+
+    def _build(self, first, last):
+        bounds, order = self._bounds, self.order
+        lo = [min(bounds[order[i]][k] for i in range(first, last)) for k in range(3)]
+        hi = [max(bounds[order[i]][k+3] for i in range(first, last)) for k in range(3)]
+        node = len(self.left)
+        self.lo.extend(lo)
+        self.hi.extend(hi)
+        self.left.append(-1)
+        self.right.append(-1)
+        self.start.append(first)
+        self.count.append(last - first)
+        if last - first <= LEAF_SIZE:
+            return node
+
+        # Median split along the widest axis of the primitive centres.
+        centre = lambda i, k: bounds[i][k] + bounds[i][k+3]
+        spans = [max(centre(order[i], k) for i in range(first, last)) -
+                 min(centre(order[i], k) for i in range(first, last)) for k in range(3)]
+        axis = spans.index(max(spans))
+        ids = sorted(order[first:last], key=lambda i: centre(i, axis))
+        order[first:last] = array('i', ids)
+        mid = (first + last) // 2
+        self.left[node] = self._build(first, mid)
+        self.right[node] = self._build(mid, last)
+        self.count[node] = 0
+        return node
+
+    def raycast(self, ox, oy, oz, dx, dy, dz, t_max):
+        # Nearest hit along a unit-direction ray within t_max, or -1. The
+        # nearer child is visited first, so the first hits shrink the
+        # limit that prunes the farther subtrees.
+        if not self.prims:
+            return -1
+        ix, iy, iz = inverse_direction(dx, dy, dz)
+        lo, hi = self.lo, self.hi
+        entry = ray_box(ox, oy, oz, ix, iy, iz, lo[0], lo[1], lo[2], hi[0], hi[1], hi[2], t_max)
+        if entry < 0:
+            return -1
+        best = -1
+        stack = [(0, entry)]
+        while stack:
+            node, entry = stack.pop()
+            limit = best if best >= 0 else t_max
+            if entry > limit:
+                continue
+            left = self.left[node]
+            if left >= 0:
+                right = self.right[node]
+                a, b = left*3, right*3
+                tl = ray_box(ox, oy, oz, ix, iy, iz, lo[a], lo[a+1], lo[a+2], hi[a], hi[a+1], hi[a+2], limit)
+                tr = ray_box(ox, oy, oz, ix, iy, iz, lo[b], lo[b+1], lo[b+2], hi[b], hi[b+1], hi[b+2], limit)
+                if tl >= 0 and tr >= 0:
+                    if tl <= tr:
+                        stack += ((right, tr), (left, tl))
+                    else:
+                        stack += ((left, tl), (right, tr))
+                elif tl >= 0:
+                    stack.append((left, tl))
+                elif tr >= 0:
+                    stack.append((right, tr))
+                continue
+            for i in range(self.start[node], self.start[node] + self.count[node]):
+                kind, p = self.prims[self.order[i]]
+                if kind == SPHERE:
+                    t = ray_sphere(ox, oy, oz, dx, dy, dz, p[0], p[1], p[2], p[3], limit)
+                else:
+                    x, y, z, hx, hy, hz = p
+                    t = ray_box(ox, oy, oz, ix, iy, iz, x-hx, y-hy, z-hz, x+hx, y+hy, z+hz, limit)
+                if t >= 0 and (best < 0 or t < best):
+                    best = limit = t
+        return best
+
+    def query_hull(self, hull):
+        # hull: [(centre, axes, half), ...] oriented boxes in world space.
+        # Returns the index of the first primitive touching any of them, or -1.
+        if not self.prims:
+            return -1
+        boxes = [(c, a, h, obb_bounds(c, a, h)) for c, a, h in hull]
+        qlo = [min(b[3][k] for b in boxes) for k in range(3)]
+        qhi = [max(b[3][k+3] for b in boxes) for k in range(3)]
+        lo, hi = self.lo, self.hi
+        stack = [0]
+        while stack:
+            node = stack.pop()
+            o = node*3
+            if (lo[o] > qhi[0] or hi[o] < qlo[0] or lo[o+1] > qhi[1] or hi[o+1] < qlo[1]
+                    or lo[o+2] > qhi[2] or hi[o+2] < qlo[2]):
+                continue
+            if self.left[node] >= 0:
+                stack.append(self.left[node])
+                stack.append(self.right[node])
+                continue
+            for i in range(self.start[node], self.start[node] + self.count[node]):
+                idx = self.order[i]
+                kind, p = self.prims[idx]
+                for c, a, h, _ in boxes:
+                    if kind == SPHERE:
+                        if sphere_overlaps_obb(p[0], p[1], p[2], p[3], c, a, h):
+                            return idx
+                    elif obb_overlaps_aabb(c, a, h, *p):
+                        return idx
+        return -1
@@ -0,0 +1,168 @@
+# ==========================
+# CAMERA RIG
+# locked / follow / chase / cinematic cameras for every vehicle.
+# Everything is plain float math on slots, so a frame never builds a Vec3.
+# ==========================
+
+from math import sin, cos, atan2, sqrt, radians, degrees, pi
+from array import array
+
+CAMERA_MODES = ('locked', 'follow', 'chase', 'cinematic')
+
+SPLINE_CONTROL_POINTS = 16
+SPLINE_SAMPLES = 512
+
+# Occlusion avoidance (chase / cinematic only)
+OCCLUDED_MODES = ('chase', 'cinematic')
+OCCLUSION_MARGIN = 0.4      # kept between the camera and whatever it hit
+MIN_CAMERA_DISTANCE = 1.5
+PULL_IN_RATE, PULL_OUT_RATE = 15, 2
+
+
+# ===== Per-vehicle settings =====
+class RigProfile:
+    __slots__ = ('distance', 'height', 'pitch', 'look_height', 'chase_rate',
+                 'orbit_radius', 'orbit_wobble', 'orbit_height', 'height_wobble',
+                 'orbit_period', 'cinematic_rate', 'world_offset', 'path_x', 'path_y', 'path_z')
+
+    def __init__(self, distance=8, height=4, pitch=20, look_height=1, chase_rate=5,
+                 orbit_radius=10, orbit_wobble=2, orbit_height=6, height_wobble=3,
+                 orbit_period=25, cinematic_rate=2, world_offset=False):
+        # world_offset: locked / chase sit behind the target along world +z
+        # and never turn with it, instead of trailing its heading.
+        self.world_offset = world_offset
+        self.distance, self.height, self.pitch = distance, height, pitch
+        self.look_height, self.chase_rate = look_height, chase_rate
+        self.orbit_radius, self.orbit_wobble = orbit_radius, orbit_wobble
+        self.orbit_height, self.height_wobble = orbit_height, height_wobble
+        self.orbit_period, self.cinematic_rate = orbit_period, cinematic_rate
+        self.path_x, self.path_y, self.path_z = build_orbit_path(
+            orbit_radius, orbit_wobble, orbit_height, height_wobble)
+
+
+# ===== Cinematic path =====
+def _catmull_rom(p0, p1, p2, p3, t):
+    t2 = t * t
+    t3 = t2 * t
+    return 0.5 * (2*p1 + (p2-p0)*t + (2*p0 - 5*p1 + 4*p2 - p3)*t2 + (3*p1 - p0 - 3*p2 + p3)*t3)
+
+
+def build_orbit_path(radius, wobble, height, height_wobble,
+                     controls=SPLINE_CONTROL_POINTS, samples=SPLINE_SAMPLES):
+    # Control points ride a wobbling orbit around the target; the closed
+    # Catmull-Rom spline through them is baked into flat offset tables.
+    cx, cy, cz = [], [], []
+    for i in range(controls):
+        a = 2*pi * i / controls
+        r = radius + sin(a*3) * wobble
+        cx.append(r * cos(a))
+        cz.append(r * sin(a))
+        cy.append(height + sin(a*2) * height_wobble)
+
+    xs, ys, zs = array('d', [0.0])*samples, array('d', [0.0])*samples, array('d', [0.0])*samples
+    for s in range(samples):
+        u = s * controls / samples
+        i = int(u)
+        t = u - i
+        i0, i1, i2, i3 = (i-1) % controls, i, (i+1) % controls, (i+2) % controls
+        xs[s] = _catmull_rom(cx[i0], cx[i1], cx[i2], cx[i3], t)
+        ys[s] = _catmull_rom(cy[i0], cy[i1], cy[i2], cy[i3], t)
+        zs[s] = _catmull_rom(cz[i0], cz[i1], cz[i2], cz[i3], t)
+    return xs, ys, zs
+
+
+# ===== Rig =====
+class CameraRig:
+    __slots__ = ('x', 'y', 'z', 'pitch', 'yaw', 'phase', 'snap_next', 'mode',
+                 'pull', 'tx', 'ty', 'tz')
+
+    def __init__(self):
+        self.x = self.y = self.z = 0.0
+        self.pitch = self.yaw = 0.0
+        self.phase = 0.0
+        self.snap_next = True
+        self.mode = 'locked'
+        # Fraction of the target -> camera offset actually used
+        self.pull = 1.0
+        self.tx = self.ty = self.tz = 0.0
+
+    def snap(self):
+        self.snap_next = True
+
+    def update(self, dt, profile, mode, tx, ty, tz, heading, zoom):
+        self.mode = mode
+        if mode not in OCCLUDED_MODES:
+            self.pull = 1.0
+        if mode == 'locked' or mode == 'chase':
+            if profile.world_offset:
+                heading = 0.0
+            h = radians(heading)
+            dist = profile.distance + zoom
+            gx = tx - sin(h) * dist
+            gy = ty + profile.height + zoom*0.5
+            gz = tz - cos(h) * dist
+            self._move(gx, gy, gz, profile.chase_rate*dt if mode == 'chase' else 1)
+            self.pitch = profile.pitch
+            self.yaw = heading
+
+        elif mode == 'follow':
+            self._move(tx, ty + profile.height + zoom*0.5, tz - profile.distance - zoom, 1)
+            self._look_at(tx, ty + profile.look_height, tz)
+
+        elif mode == 'cinematic':
+            self.phase = (self.phase + dt / profile.orbit_period) % 1.0
+            u = self.phase * SPLINE_SAMPLES
+            i = int(u)
+            f = u - i
+            j = (i + 1) % SPLINE_SAMPLES
+            xs, ys, zs = profile.path_x, profile.path_y, profile.path_z
+            k = (profile.orbit_radius + zoom) / profile.orbit_radius
+            gx = tx + (xs[i] + (xs[j]-xs[i])*f) * k
+            gy = ty + ys[i] + (ys[j]-ys[i])*f
+            gz = tz + (zs[i] + (zs[j]-zs[i])*f) * k
+            self._move(gx, gy, gz, profile.cinematic_rate*dt)
+            self._look_at(tx, ty + profile.look_height, tz)
+
+    def avoid_occlusion(self, dt, tx, ty, tz, cast):
+        # cast(ox, oy, oz, dx, dy, dz, length) returns the distance to the
+        # first thing along the unit ray, or -1. Cast from the target to
+        # the camera and pull the camera in ahead of any hit: quickly when
+        # something gets in the way, slowly when it clears. The rig's own
+        # position is untouched, so chase smoothing isn't disturbed.
+        self.tx, self.ty, self.tz = tx, ty, tz
+        if self.mode not in OCCLUDED_MODES:
+            return
+        dx, dy, dz = self.x - tx, self.y - ty, self.z - tz
+        length = sqrt(dx*dx + dy*dy + dz*dz)
+        if length < 1e-6:
+            return
+        hit = cast(tx, ty, tz, dx/length, dy/length, dz/length, length)
+        allowed = 1.0 if hit < 0 else min(max(hit - OCCLUSION_MARGIN, MIN_CAMERA_DISTANCE) / length, 1.0)
+        rate = PULL_IN_RATE if allowed < self.pull else PULL_OUT_RATE
+        self.pull += (allowed - self.pull) * min(rate*dt, 1)
+
+    def _move(self, gx, gy, gz, t):
+        if self.snap_next or t >= 1:
+            self.x, self.y, self.z = gx, gy, gz
+            self.snap_next = False
+            return
+        self.x += (gx - self.x) * t
+        self.y += (gy - self.y) * t
+        self.z += (gz - self.z) * t
+
+    def _look_at(self, lx, ly, lz):
+        dx, dy, dz = lx - self.x, ly - self.y, lz - self.z
+        self.yaw = degrees(atan2(dx, dz))
+        self.pitch = degrees(atan2(-dy, sqrt(dx*dx + dz*dz)))
+
+    def apply(self, cam):
+        if self.pull < 1.0:
+            k = self.pull
+            cam.x = self.tx + (self.x - self.tx) * k
+            cam.y = self.ty + (self.y - self.ty) * k
+            cam.z = self.tz + (self.z - self.tz) * k
+        else:
+            cam.x, cam.y, cam.z = self.x, self.y, self.z
+        cam.rotation_x = self.pitch
+        cam.rotation_y = self.yaw
+        cam.rotation_z = 0
@@ -0,0 +1,98 @@
+# ==========================
+# CCD
+# Continuous collision for the vehicles: a frame is split into substeps
+# whenever the vehicle could move more than a fraction of the smallest
+# collider, and a hit is refined by bisection to a time of impact, so
+# results no longer depend on the frame rate.
+# ==========================
+
+from collections import deque
+from math import ceil
+
+from geometry import heading_axes, obb_overlaps_aabb_xz
+
+SUBSTEP_FRACTION = 0.5      # of the smallest collider half extent
+MAX_SUBSTEPS = 32
+BISECT_STEPS = 8
+
+
+def substep_count(displacement, min_extent, fraction=SUBSTEP_FRACTION, max_steps=MAX_SUBSTEPS):
+    return max(1, min(max_steps, ceil(displacement / (min_extent * fraction))))
+
+
+class CarCollider:
+    # Static ground-plane boxes (centre x, centre z, half x, half z) tested
+    # against the car footprint.
+    def __init__(self, boxes, half_width, half_length):
+        self.boxes = list(boxes)
+        self.half_width, self.half_length = half_width, half_length
+        self.min_extent = min([half_width, half_length] + [min(b[2], b[3]) for b in self.boxes])
+        # Any box farther than this from the car centre can't touch it
+        self._reach = [(half_width**2 + half_length**2) ** 0.5 + (b[2]**2 + b[3]**2) ** 0.5 for b in self.boxes]
+
+    def hit(self, state):
+        return self.hit_pose(state.x, state.z, state.heading)
+
+    def hit_pose(self, x, z, heading):
+        s, c = heading_axes(heading)
+        hw, hl = self.half_width, self.half_length
+        for i, (bx, bz, bhx, bhz) in enumerate(self.boxes):
+            r = self._reach[i]
+            if abs(bx - x) > r or abs(bz - z) > r:
+                continue
+            if obb_overlaps_aabb_xz(x, z, hw, hl, s, c, bx, bz, bhx, bhz):
+                return i
+        return -1
+
+
+def reachable(collider, start, goal, bounds, step=1.0, headings=(0.0, 90.0)):
+    # Flood fill over a grid of car positions inside bounds (x0, z0, x1, z1)
+    # from start to goal, both (x, z). A cell is open when the car fits
+    # there at any of `headings`: a coarse check that some route exists,
+    # not a path the car could necessarily steer.
+    x0, z0, x1, z1 = bounds
+    cols, rows = int((x1 - x0) / step) + 1, int((z1 - z0) / step) + 1
+    cell = lambda x, z: (min(max(round((x - x0) / step), 0), cols - 1),
+                         min(max(round((z - z0) / step), 0), rows - 1))
+    open_ = lambda i, j: any(collider.hit_pose(x0 + i*step, z0 + j*step, h) < 0 for h in headings)
+    first, target = cell(*start), cell(*goal)
+    if not open_(*first):
+        return False
+    seen, todo = {first}, deque([first])
+    while todo:
+        i, j = todo.popleft()
+        if (i, j) == target:
+            return True
+        for n in ((i+1, j), (i-1, j), (i, j+1), (i, j-1)):
+            if 0 <= n[0] < cols and 0 <= n[1] < rows and n not in seen:
+                seen.add(n)
+                if open_(*n):
+                    todo.append(n)
+    return False
+
+
+def advance(state, step, hit, dt, max_speed, min_extent):
+    # step(h) advances `state` by h seconds; hit() returns the index of a
+    # collider overlapping the current pose, or -1. Returns (index, time of
+    # impact within this frame) on contact with the state left at the last
+    # free pose, else (-1, None).
+    n = substep_count(max_speed * dt, min_extent)
+    h = dt / n
+    for i in range(n):
+        state.save_pose()
+        step(h)
+        index = hit()
+        if index < 0:
+            continue
+        end = state.pose()
+        lo, hi = 0.0, 1.0
+        for _ in range(BISECT_STEPS):
+            mid = (lo + hi) / 2
+            state.lerp_pose(end, mid)
+            if hit() >= 0:
+                hi = mid
+            else:
+                lo = mid
+        state.lerp_pose(end, lo)
+        return index, (i + hi) * h
+    return -1, None
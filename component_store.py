@@ -0,0 +1,155 @@
+# ==========================
+# COMPONENT STORE
+# Simulation objects as rows of contiguous NumPy columns (position,
+# velocity, half extents, heading, phase, flags) instead of one Python
+# Entity each. Systems work on whole columns at once; render Entities are
+# thin views that only get their transforms copied once per frame.
+# ==========================
+
+import numpy as np
+
+# Flags
+ALIVE, SOLID, MOVING, WANDER, VISIBLE = 1, 2, 4, 8, 16
+
+WANDER_SPEED = 1.2
+
+
+class ComponentStore:
+    def __init__(self, capacity=256):
+        self.count = 0      # rows in use, including killed ones awaiting reuse
+        self.free = []
+        self._alloc(capacity)
+
+    def _alloc(self, capacity):
+        old = getattr(self, 'pos', None)
+        columns = {
+            'pos': np.zeros((capacity, 3)), 'vel': np.zeros((capacity, 3)),
+            'half': np.zeros((capacity, 3)), 'heading': np.zeros(capacity),
+            'phase': np.zeros(capacity), 'flags': np.zeros(capacity, np.uint32),
+            'dirty': np.zeros(capacity, bool),     # transform changed since the last sync
+        }
+        for name, column in columns.items():
+            if old is not None:
+                column[:self.count] = getattr(self, name)[:self.count]
+            setattr(self, name, column)
+        self.capacity = capacity
+
+    def spawn(self, pos, half, flags=SOLID, vel=(0, 0, 0), heading=0.0, phase=0.0):
+        if self.free:
+            row = self.free.pop()
+        else:
+            if self.count == self.capacity:
+                self._alloc(self.capacity * 2)
+            row = self.count
+            self.count += 1
+        self.pos[row], self.half[row], self.vel[row] = pos, half, vel
+        self.heading[row], self.phase[row] = heading, phase
+        self.flags[row] = flags | ALIVE | VISIBLE
+        self.dirty[row] = True
+        return row
+
+    def kill(self, row):
+        self.flags[row] = 0
+        self.free.append(row)
+
+    def clear(self):
+        self.count = 0
+        self.free.clear()
+        self.flags[:] = 0
+
+    def place(self, row, x, y, z, heading=None):
+        self.pos[row] = x, y, z
+        if heading is not None:
+            self.heading[row] = heading
+        self.dirty[row] = True
+
+    def rows(self, flags):
+        # Live rows that have every bit of `flags` set.
+        return np.flatnonzero((self.flags[:self.count] & (flags | ALIVE)) == (flags | ALIVE))
+
+
+# ===== Systems =====
+def wander_system(store, t, speed=WANDER_SPEED):
+    # Slow drift around the spot, each row on its own phase.
+    rows = store.rows(WANDER | MOVING)
+    a = t + store.phase[rows]
+    store.vel[rows, 0] = np.sin(a) * speed
+    store.vel[rows, 2] = np.cos(a) * speed
+
+
+def movement_system(store, dt):
+    rows = store.rows(MOVING)
+    store.pos[rows] += store.vel[rows] * dt
+    store.dirty[rows] = True
+
+
+def overlap_system(store, x, z, hw, hl, heading):
+    # Rows of solid objects whose ground footprint overlaps an oriented box
+    # (half width hw, half length hl, heading in degrees): 2D separating
+    # axis test on the four box axes, for every row at once.
+    rows = store.rows(SOLID)
+    if not len(rows):
+        return rows
+    a = np.radians(heading)
+    s, c = np.sin(a), np.cos(a)
+    b = np.radians(store.heading[rows])
+    sb, cb = np.sin(b), np.cos(b)
+    hx, hz = store.half[rows, 0], store.half[rows, 2]
+    dx, dz = store.pos[rows, 0] - x, store.pos[rows, 2] - z
+    hit = np.ones(len(rows), bool)
+    # Right (c, -s) and forward (s, c) of the box, then of every row
+    for ux, uz in ((c, -s), (s, c), (cb, -sb), (sb, cb)):
+        ra = hw * np.abs(ux*c - uz*s) + hl * np.abs(ux*s + uz*c)
+        rb = hx * np.abs(ux*cb - uz*sb) + hz * np.abs(ux*sb + uz*cb)
+        hit &= np.abs(dx*ux + dz*uz) <= ra + rb
+    return rows[hit]
+
+
+def cull_system(store, x, z, fx, fz, half_angle, far, near):
+    # VISIBLE = within `far` and inside the view cone, or within `near`.
+    # Returns the rows whose visibility changed.
+    rows = store.rows(0)
+    dx, dz = store.pos[rows, 0] - x, store.pos[rows, 2] - z
+    d = np.hypot(dx, dz)
+    radius = np.hypot(store.half[rows, 0], store.half[rows, 2])
+    ahead = dx*fx + dz*fz >= np.cos(np.radians(half_angle)) * d - radius
+    visible = (d - radius <= near) | ((d - radius <= far) & ahead)
+    was = (store.flags[rows] & VISIBLE) != 0
+    changed = rows[visible != was]
+    store.flags[changed] ^= VISIBLE
+    return changed
+
+
+# ===== Views =====
+class ViewSync:
+    # Row -> render entities. sync() copies transforms of dirty rows and
+    # toggles entities whose visibility changed; nothing else touches them.
+    def __init__(self, store):
+        self.store = store
+        self.views = {}
+
+    def bind(self, row, *entities):
+        # Entities keep their offset from the row's position (e.g. leaves
+        # above a trunk), so several can share one row.
+        p = self.store.pos[row]
+        self.views[row] = [(e, e.x - p[0], e.y - p[1], e.z - p[2]) for e in entities]
+
+    def clear(self):
+        self.views.clear()
+
+    def sync(self, changed=()):
+        store = self.store
+        for row in np.flatnonzero(store.dirty[:store.count]):
+            view = self.views.get(row)
+            if view is None:
+                continue
+            x, y, z = store.pos[row]
+            heading = store.heading[row]
+            for e, ox, oy, oz in view:
+                e.x, e.y, e.z = x + ox, y + oy, z + oz
+                e.rotation_y = heading
+        store.dirty[:store.count] = False
+        for row in changed:
+            visible = bool(store.flags[row] & VISIBLE)
+            for e, *_ in self.views.get(row, ()):
+                e.enabled = visible
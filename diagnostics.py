@@ -0,0 +1,116 @@
+# ==========================
+# DIAGNOSTICS
+# Named probes (entity / node / collider / sequence / timer / text counts,
+# heap stats). Cheap probes are sampled a few times a second, and only
+# while someone is looking; probes that walk the scene graph or the heap
+# only run on dumps and explicit full samples (checkpoints skip them
+# unless asked). Checkpoints taken at resets and menu round trips expose
+# counts that only ever go up.
+# ==========================
+
+import gc, json, os, sys, time, tracemalloc
+from collections import deque
+
+# Full walks of the scene graph / entity list / GC: too slow for every sample
+HEAVY_PROBES = ('nodes', 'colliders', 'texts', 'gc_objects')
+
+
+def scene_probes(scene, sequences, text_class):
+    # ursina objects are passed in so this module never imports ursina.
+    # sequences: callable returning the running invoke() sequences.
+    return {
+        'entities': lambda: len(scene.entities),
+        'nodes': lambda: scene.find_all_matches('**').get_num_paths(),
+        'colliders': lambda: sum(1 for e in scene.entities if getattr(e, 'collider', None) is not None),
+        'sequences': lambda: len(sequences()),
+        'texts': lambda: sum(1 for e in scene.entities if isinstance(e, text_class)),
+    }
+
+
+def timer_probes(wheels):
+    # wheels: callable returning the TimerWheels whose pending timers count.
+    return {'timers': lambda: sum(len(w) for w in wheels())}
+
+
+def heap_probes():
+    probes = {
+        'heap_blocks': sys.getallocatedblocks,
+        'gc_objects': lambda: len(gc.get_objects()),
+    }
+    if tracemalloc.is_tracing():
+        probes['traced_bytes'] = lambda: tracemalloc.get_traced_memory()[0]
+        probes['traced_peak'] = lambda: tracemalloc.get_traced_memory()[1]
+    return probes
+
+
+class Diagnostics:
+    def __init__(self, probes, interval=0.5, history=600, checkpoints=256, heavy=HEAVY_PROBES):
+        self.probes = dict(probes)
+        self.heavy = set(heavy)
+        self.interval = interval
+        self.history = deque(maxlen=history)
+        self.checkpoints = deque(maxlen=checkpoints)
+        self.latest = None
+        self.known = {}     # last value of every probe, heavy ones included
+        self._since = 0.0
+
+    def sample(self, full=False):
+        row = {'t': time.time()}
+        for name, probe in self.probes.items():
+            if full or name not in self.heavy:
+                row[name] = probe()
+        self.latest = row
+        self.known.update(row)
+        self.history.append(row)
+        return row
+
+    def update(self, dt, active=True):
+        # Per-frame hook; samples the cheap probes every `interval` while
+        # active (overlay shown) and returns True when it took a sample.
+        if not active:
+            self._since = self.interval
+            return False
+        self._since += dt
+        if self._since < self.interval:
+            return False
+        self._since = 0.0
+        self.sample()
+        return True
+
+    def checkpoint(self, label, window=5, full=False):
+        # Samples at a known-equivalent moment (after a reset, back at the
+        # menu) and reports probes that grew across the last `window` ones.
+        self.checkpoints.append(dict(self.sample(full), label=label))
+        grown = self.growth(label, window)
+        if grown:
+            print(f"[diagnostics] growing across {window} '{label}' checkpoints: "
+                  + ', '.join(f'{name} +{delta}' for name, delta in grown.items()))
+        return grown
+
+    def growth(self, label, window=5):
+        rows = [c for c in self.checkpoints if c['label'] == label][-(window + 1):]
+        if len(rows) <= window:
+            return {}
+        grown = {}
+        for name in self.probes:
+            values = [r[name] for r in rows if name in r]
+            if len(values) < len(rows):
+                continue
+            if values[-1] > values[0] and all(b >= a for a, b in zip(values, values[1:])):
+                grown[name] = values[-1] - values[0]
+        return grown
+
+    def format(self):
+        # Heavy probes show their value from the last full sample.
+        if any(name not in self.known for name in self.probes):
+            self.sample(full=True)
+        return '\n'.join(f'{name}: {self.known[name]}' + ('' if name in self.latest else ' *')
+                         for name in self.probes)
+
+    def dump(self, path):
+        self.sample(full=True)
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        with open(path, 'w') as f:
+            json.dump({'latest': self.latest, 'history': list(self.history),
+                       'checkpoints': list(self.checkpoints)}, f, indent=1)
+        return path
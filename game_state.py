@@ -0,0 +1,31 @@
+# ==========================
+# GAME STATE
+# Explicit game flow: a transition is only taken if the table allows it,
+# and entering the state you are already in does nothing.
+# ==========================
+
+MENU, PLAYING, CRASHED, PARKED, RESETTING = 'menu', 'playing', 'crashed', 'parked', 'resetting'
+
+TRANSITIONS = {
+    MENU: (PLAYING,),
+    PLAYING: (CRASHED, PARKED, RESETTING),
+    CRASHED: (RESETTING,),
+    PARKED: (RESETTING,),
+    RESETTING: (PLAYING, MENU),
+}
+
+
+class StateMachine:
+    def __init__(self, initial, transitions=TRANSITIONS):
+        self.state = initial
+        self.transitions = transitions
+
+    def can_enter(self, state):
+        return state in self.transitions.get(self.state, ())
+
+    def enter(self, state):
+        # True if the transition happened, False if it was refused.
+        if not self.can_enter(state):
+            return False
+        self.state = state
+        return True
@@ -0,0 +1,117 @@
+# ==========================
+# GEOMETRY
+# Analytic overlap tests on plain floats, for code that runs without
+# ursina colliders (headless simulation, servers, tools).
+# ==========================
+
+from math import sin, cos, radians
+
+
+def heading_axes(heading):
+    a = radians(heading)
+    return sin(a), cos(a)
+
+
+def obb_overlaps_aabb_xz(cx, cz, hw, hl, s, c, bx, bz, bhx, bhz):
+    # Separating axis test on the ground plane. The oriented box is centred
+    # at (cx, cz) with half width hw and half length hl; its forward axis is
+    # (s, c) and its right axis (c, -s). The other box is axis aligned.
+    dx, dz = bx - cx, bz - cz
+    ac, as_ = abs(c), abs(s)
+    if abs(dx) > hw*ac + hl*as_ + bhx: return False
+    if abs(dz) > hw*as_ + hl*ac + bhz: return False
+    if abs(dx*c - dz*s) > hw + bhx*ac + bhz*as_: return False
+    if abs(dx*s + dz*c) > hl + bhx*as_ + bhz*ac: return False
+    return True
+
+
+# ===== 3D =====
+def orientation_axes(pitch, yaw):
+    # Right, up and forward unit vectors for an ursina rotation (pitch, yaw, 0).
+    p, h = radians(pitch), radians(yaw)
+    sp, cp, sh, ch = sin(p), cos(p), sin(h), cos(h)
+    return (ch, 0.0, -sh), (sh*sp, cp, ch*sp), (sh*cp, -sp, ch*cp)
+
+
+def sphere_overlaps_obb(sx, sy, sz, r, center, axes, half):
+    # Clamp the sphere centre into the box along each axis; exact.
+    dx, dy, dz = sx - center[0], sy - center[1], sz - center[2]
+    d2 = 0.0
+    for (ax, ay, az), h in zip(axes, half):
+        t = dx*ax + dy*ay + dz*az
+        if t > h:
+            d2 += (t - h) ** 2
+        elif t < -h:
+            d2 += (t + h) ** 2
+    return d2 <= r*r
+
+
+def obb_overlaps_aabb(center, axes, half, bx, by, bz, bhx, bhy, bhz):
+    # Separating axis test (15 axes) between an oriented box and an axis
+    # aligned one. R[i][j] is world axis i dotted with box axis j.
+    eps = 1e-6
+    R = [[axes[j][i] for j in range(3)] for i in range(3)]
+    A = [[abs(R[i][j]) + eps for j in range(3)] for i in range(3)]
+    t = (center[0] - bx, center[1] - by, center[2] - bz)
+    a, b = (bhx, bhy, bhz), half
+    for i in range(3):
+        if abs(t[i]) > a[i] + b[0]*A[i][0] + b[1]*A[i][1] + b[2]*A[i][2]:
+            return False
+    for j in range(3):
+        if abs(t[0]*R[0][j] + t[1]*R[1][j] + t[2]*R[2][j]) > a[0]*A[0][j] + a[1]*A[1][j] + a[2]*A[2][j] + b[j]:
+            return False
+    for i in range(3):
+        i1, i2 = (i+1) % 3, (i+2) % 3
+        for j in range(3):
+            j1, j2 = (j+1) % 3, (j+2) % 3
+            ra = a[i1]*A[i2][j] + a[i2]*A[i1][j]
+            rb = b[j1]*A[i][j2] + b[j2]*A[i][j1]
+            if abs(t[i2]*R[i1][j] - t[i1]*R[i2][j]) > ra + rb:
+                return False
+    return True
+
+
+# ===== Rays =====
+def ray_box(ox, oy, oz, ix, iy, iz, x0, y0, z0, x1, y1, z1, t_max):
+    # Slab test against an axis aligned box; (ix, iy, iz) is the inverse
+    # ray direction. Returns the entry distance in [0, t_max], or -1.
+    t0, t1 = (x0 - ox) * ix, (x1 - ox) * ix
+    lo, hi = (t0, t1) if t0 < t1 else (t1, t0)
+    t0, t1 = (y0 - oy) * iy, (y1 - oy) * iy
+    if t0 > t1: t0, t1 = t1, t0
+    if t0 > lo: lo = t0
+    if t1 < hi: hi = t1
+    t0, t1 = (z0 - oz) * iz, (z1 - oz) * iz
+    if t0 > t1: t0, t1 = t1, t0
+    if t0 > lo: lo = t0
+    if t1 < hi: hi = t1
+    if hi < lo or hi < 0 or lo > t_max:
+        return -1
+    return max(lo, 0.0)
+
+
+def ray_sphere(ox, oy, oz, dx, dy, dz, sx, sy, sz, r, t_max):
+    # (dx, dy, dz) must be unit length. Entry distance in [0, t_max], or -1.
+    lx, ly, lz = sx - ox, sy - oy, sz - oz
+    b = lx*dx + ly*dy + lz*dz
+    c = lx*lx + ly*ly + lz*lz - r*r
+    if c <= 0:
+        return 0.0
+    disc = b*b - c
+    if b < 0 or disc < 0:
+        return -1
+    t = b - disc ** 0.5
+    return t if t <= t_max else -1
+
+
+def inverse_direction(dx, dy, dz):
+    big = 1e30
+    return (1/dx if dx else big), (1/dy if dy else big), (1/dz if dz else big)
+
+
+def obb_bounds(center, axes, half):
+    # World AABB (min x, min y, min z, max x, max y, max z) of an oriented box.
+    ex = abs(axes[0][0])*half[0] + abs(axes[1][0])*half[1] + abs(axes[2][0])*half[2]
+    ey = abs(axes[0][1])*half[0] + abs(axes[1][1])*half[1] + abs(axes[2][1])*half[2]
+    ez = abs(axes[0][2])*half[0] + abs(axes[1][2])*half[1] + abs(axes[2][2])*half[2]
+    return (center[0]-ex, center[1]-ey, center[2]-ez, center[0]+ex, center[1]+ey, center[2]+ez)
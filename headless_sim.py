@@ -0,0 +1,94 @@
+# ==========================
+# HEADLESS SIMULATION
+# The car-mode GameManager rules from Car Game.py without ursina: seeded
+# layout, barriers, crash / park detection and timed resets, for any
+# number of cars. Used by the multiplayer server and batch tools.
+# ==========================
+
+from ccd import CarCollider, advance
+from level_layout import generate_layout, new_seed
+from parking import ParkingBay, ParkingEvaluator
+from vehicle_state import CarState
+from world_streaming import lot_barriers
+
+TICK_RATE = 60
+
+CAR_HALF_WIDTH, CAR_HALF_LENGTH = 0.5, 1.0
+OBSTACLE_HALF = 0.5
+# (centre x, centre z, half x, half z) of the lot barriers in Car Game.py, gates included
+BARRIER_BOXES = tuple((x, z, sx/2, sz/2) for x, _, z, sx, _, sz in lot_barriers(0, 0))
+CRASH_RESET_DELAY, PARK_RESET_DELAY = 2, 3
+
+DRIVING, CRASHED, PARKED = 'driving', 'crashed', 'parked'
+
+
+class SimCar:
+    __slots__ = ('state', 'move', 'steer', 'brake', 'status', 'resume_tick', 'start_tick')
+
+    def __init__(self, spawn):
+        self.state = CarState(spawn=spawn)
+        self.move = self.steer = self.brake = 0
+        self.status = DRIVING
+        self.resume_tick = 0
+        self.start_tick = 0
+
+
+class LotSimulation:
+    def __init__(self, seed=None, tick_rate=TICK_RATE):
+        self.layout = generate_layout(new_seed() if seed is None else seed)
+        self.tick_rate = tick_rate
+        self.dt = 1 / tick_rate
+        self.tick = 0
+        self.cars = {}
+        self.collider = CarCollider([(x, z, OBSTACLE_HALF, OBSTACLE_HALF) for x, _, z in self.layout.car_obstacles]
+                                    + list(BARRIER_BOXES), CAR_HALF_WIDTH, CAR_HALF_LENGTH)
+        self.parking_eval = ParkingEvaluator(ParkingBay.rectangle(0, 45, 3, 4),
+                                             car_width=CAR_HALF_WIDTH*2, car_length=CAR_HALF_LENGTH*2)
+
+    def spawn_point(self, car_id):
+        return ((car_id % 9 - 4) * 1.5, 0.25, -45)
+
+    def add_car(self, car_id):
+        car = SimCar(self.spawn_point(car_id))
+        car.start_tick = self.tick
+        self.cars[car_id] = car
+        return car
+
+    def remove_car(self, car_id):
+        self.cars.pop(car_id, None)
+
+    def set_input(self, car_id, move, steer, brake):
+        car = self.cars.get(car_id)
+        if car is not None:
+            car.move, car.steer, car.brake = move, steer, brake
+
+    def crashed(self, state):
+        return self.collider.hit(state) >= 0
+
+    def parked(self, state):
+        return self.parking_eval.evaluate(state.x, state.z, state.heading, state.speed()).parked
+
+    def step(self):
+        # Advances every car one tick; returns (car_id, event, seconds) tuples.
+        self.tick += 1
+        events = []
+        for car_id, car in self.cars.items():
+            if car.status != DRIVING:
+                if self.tick >= car.resume_tick:
+                    car.state.reset()
+                    car.status = DRIVING
+                    car.start_tick = self.tick
+                continue
+            s = car.state
+            index, toi = advance(s, lambda h: s.step(car.move, car.steer, car.brake, h),
+                                 lambda: self.collider.hit(s), self.dt, s.speed() + s.accel*self.dt,
+                                 self.collider.min_extent)
+            if index >= 0:
+                car.status = CRASHED
+                car.resume_tick = self.tick + CRASH_RESET_DELAY*self.tick_rate
+                events.append((car_id, CRASHED, (self.tick - 1 - car.start_tick) * self.dt + toi))
+            elif self.parked(car.state):
+                car.status = PARKED
+                car.resume_tick = self.tick + PARK_RESET_DELAY*self.tick_rate
+                events.append((car_id, PARKED, (self.tick - car.start_tick) * self.dt))
+        return events
@@ -0,0 +1,237 @@
+# ==========================
+# HEATMAP
+# Out-of-core analytics over many runs on the Car Game.py lot. Telemetry
+# files are read one column block at a time and headless runs are fed in
+# tick batches; samples are binned into NumPy grids over the 30x100 lot:
+#
+#   visits     samples per cell, every run
+#   crashes    cells where runs ended in a collision
+#   remaining  summed seconds-to-park of samples from runs that parked
+#
+# plus a histogram of time-to-park. Only each stream's open run is kept
+# in memory, never a whole file, so sample counts are unbounded. Runs end
+# on a collision / parked / reset flag, or, should a flag be missing, on
+# a time gap or a jump in position (the car put back at its spawn).
+# ==========================
+
+import argparse, random
+
+import numpy as np
+
+from telemetry import (read_telemetry, VEHICLE_CAR, EVENT_COLLISION, EVENT_PARKED, EVENT_RESET,
+                       EVENT_MARKER)
+from headless_sim import LotSimulation, CRASHED, DRIVING
+
+LOT_BOUNDS = (-15.0, -50.0, 15.0, 50.0)
+PARK_TIME_BINS = np.arange(0, 122, 2)
+RUN_END = EVENT_COLLISION | EVENT_PARKED | EVENT_RESET
+RUN_GAP = 0.5       # seconds without samples
+RUN_JUMP = 3.0      # metres between consecutive samples
+
+
+class _OpenRun:
+    __slots__ = ('ts', 'cs', 'real', 't', 'x', 'z')
+
+    def __init__(self):
+        self.ts, self.cs = [], []
+        self.real = 0       # samples that aren't event marker rows
+        self.t = self.x = self.z = None     # last sample seen on the stream
+
+
+class LotHeatmap:
+    def __init__(self, cell=0.5, bounds=LOT_BOUNDS, park_bins=PARK_TIME_BINS):
+        self.cell = cell
+        self.bounds = bounds
+        x0, z0, x1, z1 = bounds
+        self.cols = int(round((x1 - x0) / cell))
+        self.rows = int(round((z1 - z0) / cell))
+        size = self.rows * self.cols
+        self.visits = np.zeros(size, np.int64)
+        self.crashes = np.zeros(size, np.int64)
+        self.remaining = np.zeros(size, np.float64)
+        self.remaining_samples = np.zeros(size, np.int64)
+        self.park_bins = park_bins
+        self.park_times = np.zeros(len(park_bins) - 1, np.int64)
+        self.samples = self.runs = self.crashed = self.parked = 0
+        self._open = {}     # stream -> _OpenRun for the run in progress
+
+    def _cells(self, x, z):
+        # Flat cell index per sample, -1 off the lot (rows run along +z).
+        x0, z0, _, _ = self.bounds
+        i = np.floor((x - x0) / self.cell).astype(np.int64)
+        j = np.floor((z - z0) / self.cell).astype(np.int64)
+        inside = (i >= 0) & (i < self.cols) & (j >= 0) & (j < self.rows)
+        return np.where(inside, j*self.cols + i, -1)
+
+    # ===== Input =====
+    def add_samples(self, t, x, z, events, stream=0):
+        # One time-ordered slice of a stream's samples. A run ends on the
+        # first sample flagged collision, parked or reset, or just before a
+        # sample that follows a gap or a jump. Marker rows only carry flags:
+        # they get no cell, so they never count as visits.
+        x, z = np.asarray(x, np.float64), np.asarray(z, np.float64)
+        t = np.asarray(t, np.float64)
+        events = np.asarray(events)
+        marker = (events & EVENT_MARKER) != 0
+        cells = np.where(marker, -1, self._cells(x, z))
+        on_lot = cells[cells >= 0]
+        self.visits += np.bincount(on_lot, minlength=self.visits.size)
+        self.samples += int(len(t) - marker.sum())
+        if not len(t):
+            return
+
+        run = self._open.setdefault(stream, _OpenRun())
+        first = (t[0], x[0], z[0]) if run.t is None else (run.t, run.x, run.z)
+        gap = ((np.diff(t, prepend=first[0]) > RUN_GAP) |
+               (np.hypot(np.diff(x, prepend=first[1]), np.diff(z, prepend=first[2])) > RUN_JUMP))
+        run.t, run.x, run.z = t[-1], x[-1], z[-1]
+
+        # (stop, flags): the run takes samples up to stop; a flagged end
+        # sorts before a gap at the same place so its flags aren't lost.
+        ends = sorted([(i + 1, int(events[i])) for i in np.flatnonzero(events & RUN_END)] +
+                      [(i, 0) for i in np.flatnonzero(gap)], key=lambda e: (e[0], e[1] == 0))
+        start = 0
+        for stop, flags in ends:
+            self._extend(run, t[start:stop], cells[start:stop], marker[start:stop])
+            self._close_run(run, flags)
+            start = stop
+        self._extend(run, t[start:], cells[start:], marker[start:])
+
+    @staticmethod
+    def _extend(run, t, cells, marker):
+        if len(t):
+            run.ts.append(t)
+            run.cs.append(cells)
+            run.real += int(len(t) - marker.sum())
+
+    def _close_run(self, run, flags):
+        real = run.real
+        if real:
+            t, cells = np.concatenate(run.ts), np.concatenate(run.cs)
+        run.ts.clear()
+        run.cs.clear()
+        run.real = 0
+        if not real:
+            return      # nothing but marker rows (e.g. the reset after a crash)
+        self.runs += 1
+        if flags & EVENT_COLLISION:
+            self.crashed += 1
+            if cells[-1] >= 0:
+                self.crashes[cells[-1]] += 1
+        elif flags & EVENT_PARKED:
+            self.parked += 1
+            self.park_times += np.histogram([t[-1] - t[0]], self.park_bins)[0]
+            keep = cells >= 0
+            self.remaining += np.bincount(cells[keep], weights=t[-1] - t[keep], minlength=self.remaining.size)
+            self.remaining_samples += np.bincount(cells[keep], minlength=self.remaining.size)
+
+    def end_stream(self, stream=0):
+        # Drops a run cut off by the end of its file or simulation.
+        self._open.pop(stream, None)
+
+    def add_telemetry(self, path):
+        for block in read_telemetry(path, columns=('t', 'vehicle', 'x', 'z', 'events')):
+            car = np.frombuffer(block['vehicle'], np.uint8) == VEHICLE_CAR
+            self.add_samples(np.frombuffer(block['t'], np.float64)[car],
+                             np.frombuffer(block['x'], np.float32)[car],
+                             np.frombuffer(block['z'], np.float32)[car],
+                             np.frombuffer(block['events'], np.uint8)[car], stream=path)
+        self.end_stream(path)
+
+    # ===== Output =====
+    def grids(self):
+        shape = (self.rows, self.cols)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mean_remaining = self.remaining / self.remaining_samples
+        return {'visits': self.visits.reshape(shape), 'crashes': self.crashes.reshape(shape),
+                'mean_seconds_to_park': mean_remaining.reshape(shape),
+                'park_time_counts': self.park_times, 'park_time_bins': self.park_bins}
+
+    def save(self, path):
+        np.savez_compressed(path, bounds=np.array(self.bounds), cell=self.cell,
+                            runs=self.runs, crashed=self.crashed, parked=self.parked, **self.grids())
+
+    def merge(self, other):
+        # Folds in a heatmap accumulated elsewhere (another process / machine).
+        for name in ('visits', 'crashes', 'remaining', 'remaining_samples', 'park_times'):
+            getattr(self, name).__iadd__(getattr(other, name))
+        self.samples += other.samples
+        self.runs += other.runs
+        self.crashed += other.crashed
+        self.parked += other.parked
+
+
+# ===== Headless runs =====
+def wander_policy(rng):
+    # Drives forward with a sticky random steer, braking when fast near the bay.
+    steer = {}
+
+    def policy(car_id, state):
+        if car_id not in steer or rng.random() < 0.03:
+            steer[car_id] = rng.choice((-1, 0, 0, 1))
+        brake = 1 if state.z > 38 and state.speed() > 2 else 0
+        return (0 if brake else 1), steer[car_id], brake
+    return policy
+
+
+def simulate(heatmap, seeds, cars=8, seconds=60, batch_ticks=600, policy=None, rng=None):
+    # Runs `cars` cars per seed and feeds their samples in batches of
+    # batch_ticks; samples from held (crashed / parked) cars are skipped.
+    rng = rng or random.Random()
+    policy = policy or wander_policy(rng)
+    for seed in seeds:
+        sim = LotSimulation(seed)
+        for car_id in range(cars):
+            sim.add_car(car_id)
+        ticks = int(seconds * sim.tick_rate)
+        t = np.empty((batch_ticks, cars))
+        x, z = np.empty((batch_ticks, cars)), np.empty((batch_ticks, cars))
+        events = np.zeros((batch_ticks, cars), np.uint8)
+        live = np.zeros((batch_ticks, cars), bool)
+        row = 0
+        for _ in range(ticks):
+            for car_id, car in sim.cars.items():
+                sim.set_input(car_id, *policy(car_id, car.state))
+            ended = {car_id: kind for car_id, kind, _ in sim.step()}
+            for car_id, car in sim.cars.items():
+                s = car.state
+                live[row, car_id] = car.status == DRIVING or car_id in ended
+                t[row, car_id], x[row, car_id], z[row, car_id] = sim.tick * sim.dt, s.x, s.z
+                flag = ended.get(car_id)
+                events[row, car_id] = 0 if flag is None else \
+                    (EVENT_COLLISION if flag == CRASHED else EVENT_PARKED) | EVENT_RESET
+            row += 1
+            if row == batch_ticks:
+                _flush(heatmap, seed, t, x, z, events, live, row)
+                events[:] = 0
+                row = 0
+        _flush(heatmap, seed, t, x, z, events, live, row)
+        for car_id in range(cars):
+            heatmap.end_stream((seed, car_id))
+
+
+def _flush(heatmap, seed, t, x, z, events, live, rows):
+    for c in range(t.shape[1]):
+        keep = live[:rows, c]
+        heatmap.add_samples(t[:rows, c][keep], x[:rows, c][keep], z[:rows, c][keep],
+                            events[:rows, c][keep], stream=(seed, c))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bin Car Game runs into lot heatmaps')
+    parser.add_argument('telemetry', nargs='*', help='telemetry .tlm files')
+    parser.add_argument('--headless', type=int, default=0, help='headless lots to simulate')
+    parser.add_argument('--cars', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=60)
+    parser.add_argument('--cell', type=float, default=0.5)
+    parser.add_argument('--out', default='heatmap.npz')
+    args = parser.parse_args()
+
+    heatmap = LotHeatmap(cell=args.cell)
+    for path in args.telemetry:
+        heatmap.add_telemetry(path)
+    if args.headless:
+        simulate(heatmap, range(args.headless), cars=args.cars, seconds=args.seconds)
+    heatmap.save(args.out)
+    print(f'{heatmap.samples} samples, {heatmap.runs} runs ({heatmap.crashed} crashed, '
+          f'{heatmap.parked} parked) -> {args.out}')
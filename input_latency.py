@@ -0,0 +1,132 @@
+# ==========================
+# INPUT LATENCY
+# Stamps every driving key event as it reaches input() (or as held_keys
+# flips, for events that never do), then follows it to the simulation
+# tick that consumes it and the frame that presents the result:
+#
+#   poll    - previous frame presented -> event handed to the game
+#   sim     - event handed to the game -> first tick that consumed it
+#   present - that tick -> its frame submitted for rendering
+#   total   - sum of the three
+#
+# Each stage goes into a fixed-bucket histogram for the whole session.
+# ==========================
+
+import atexit, json, os
+from array import array
+from time import perf_counter
+
+STAGES = ('poll', 'sim', 'present', 'total')
+
+
+class LatencyHistogram:
+    __slots__ = ('bucket_ms', 'counts', 'n', 'total_ms', 'max_ms')
+
+    def __init__(self, bucket_ms=1.0, buckets=250):
+        self.bucket_ms = bucket_ms
+        self.counts = array('I', [0]) * (buckets + 1)   # last bucket is overflow
+        self.n = 0
+        self.total_ms = self.max_ms = 0.0
+
+    def add(self, seconds):
+        ms = seconds * 1000
+        self.counts[min(int(ms / self.bucket_ms), len(self.counts) - 1)] += 1
+        self.n += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, p):
+        # Upper edge of the bucket holding the p-th percentile sample.
+        if not self.n:
+            return None
+        rank = p / 100 * self.n
+        seen = 0
+        for i, c in enumerate(self.counts):
+            seen += c
+            if seen >= rank:
+                return (i + 1) * self.bucket_ms
+        return self.max_ms
+
+    def summary(self):
+        return {'count': self.n, 'mean_ms': self.total_ms / self.n if self.n else None,
+                'p50_ms': self.percentile(50), 'p95_ms': self.percentile(95),
+                'p99_ms': self.percentile(99), 'max_ms': self.max_ms}
+
+
+class InputLatency:
+    def __init__(self, keys, export_path=None, bucket_ms=1.0, buckets=250, clock=perf_counter):
+        self.keys = tuple(keys)
+        self.clock = clock
+        self.held = dict.fromkeys(self.keys, 0)
+        self.last_present = None
+        self.arrived = []   # (key, arrival time, poll wait)
+        self.ticked = []    # (arrival time, poll wait, tick time)
+        self.histograms = {stage: LatencyHistogram(bucket_ms, buckets) for stage in STAGES}
+        self.export_path = export_path
+        if export_path:
+            atexit.register(self._export_at_exit)
+
+    # ===== Hooks, in frame order =====
+    def key_event(self, key):
+        # From input(): 'w' and 'w up' both count, 'w hold' doesn't.
+        name = key[:-3] if key.endswith(' up') else key
+        if name in self.held:
+            self._arrive(name, key == name)
+
+    def poll(self, held_keys):
+        # Start of the tick: catches held_keys flips that input() never saw.
+        for key in self.keys:
+            down = 1 if held_keys[key] else 0
+            if down != self.held[key]:
+                self._arrive(key, down)
+
+    def tick(self):
+        # The simulation just consumed the current inputs.
+        if not self.arrived:
+            return
+        now = self.clock()
+        sim = self.histograms['sim']
+        for _, arrival, wait in self.arrived:
+            sim.add(now - arrival)
+            self.ticked.append((arrival, wait, now))
+        self.arrived.clear()
+
+    def present(self):
+        # After the frame holding that tick was submitted for rendering.
+        now = self.clock()
+        h = self.histograms
+        for arrival, wait, ticked in self.ticked:
+            h['poll'].add(wait)
+            h['present'].add(now - ticked)
+            h['total'].add(wait + now - arrival)
+        self.ticked.clear()
+        self.last_present = now
+
+    def discard(self):
+        # Inputs that arrive while the simulation is held are never consumed.
+        self.arrived.clear()
+
+    def _arrive(self, key, down):
+        now = self.clock()
+        self.held[key] = down
+        wait = now - self.last_present if self.last_present is not None else 0.0
+        self.arrived.append((key, now, wait))
+
+    # ===== Export =====
+    def summary(self):
+        return {stage: h.summary() for stage, h in self.histograms.items()}
+
+    def export(self, path=None):
+        path = path or self.export_path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        data = {'keys': self.keys, 'summary': self.summary(),
+                'histograms': {stage: {'bucket_ms': h.bucket_ms, 'counts': h.counts.tolist()}
+                               for stage, h in self.histograms.items()}}
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=1)
+        return path
+
+    def _export_at_exit(self):
+        if self.histograms['total'].n:
+            self.export()
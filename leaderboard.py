@@ -0,0 +1,117 @@
+# ==========================
+# LEADERBOARD
+# Local SQLite history of every finished park / landing. Writes are queued
+# and committed in batches by a background thread, so the game loop only
+# ever does a queue put.
+# ==========================
+
+import atexit, queue, sqlite3, threading, time
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS runs (
+        id INTEGER PRIMARY KEY,
+        seed INTEGER NOT NULL,
+        mode TEXT NOT NULL,
+        player TEXT NOT NULL,
+        seconds REAL NOT NULL,
+        finished_at REAL NOT NULL)""",
+    "CREATE INDEX IF NOT EXISTS runs_by_level ON runs (seed, mode, seconds)",
+    "CREATE INDEX IF NOT EXISTS runs_by_player ON runs (player, mode, seed, seconds)",
+)
+
+_STOP = object()
+
+
+def _connect(path):
+    conn = sqlite3.connect(path, timeout=5)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+class Leaderboard:
+    def __init__(self, path='leaderboard.db', batch_size=64, flush_interval=0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.SimpleQueue()
+        self._flushed = threading.Condition()
+        self._pending = 0
+
+        conn = _connect(path)
+        with conn:
+            for statement in SCHEMA:
+                conn.execute(statement)
+        self._reader = conn
+
+        self._writer = threading.Thread(target=self._write_loop, name='leaderboard-writer', daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    # ===== Frame thread =====
+    def record(self, seed, mode, seconds, player='local'):
+        with self._flushed:
+            self._pending += 1
+        self._queue.put((seed, mode, player, seconds, time.time()))
+
+    def top(self, seed, mode, n=10):
+        return self._reader.execute(
+            'SELECT player, seconds, finished_at FROM runs WHERE seed=? AND mode=? '
+            'ORDER BY seconds LIMIT ?', (seed, mode, n)).fetchall()
+
+    def personal_best(self, mode, player='local', seed=None):
+        if seed is None:
+            row = self._reader.execute(
+                'SELECT MIN(seconds) FROM runs WHERE player=? AND mode=?', (player, mode)).fetchone()
+        else:
+            row = self._reader.execute(
+                'SELECT MIN(seconds) FROM runs WHERE player=? AND mode=? AND seed=?',
+                (player, mode, seed)).fetchone()
+        return row[0]
+
+    def flush(self, timeout=None):
+        with self._flushed:
+            return self._flushed.wait_for(lambda: self._pending == 0, timeout)
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(_STOP)
+            self._writer.join()
+        self._reader.close()
+
+    # ===== Writer thread =====
+    def _write_loop(self):
+        # A failed batch is reported and dropped; the loop keeps going so
+        # flush() and later records never wait on a dead thread.
+        conn = None
+        running = True
+        while running:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            if _STOP in batch:
+                running = False
+                batch = [row for row in batch if row is not _STOP]
+            if not batch:
+                continue
+            try:
+                if conn is None:
+                    conn = _connect(self.path)
+                with conn:
+                    conn.executemany(
+                        'INSERT INTO runs (seed, mode, player, seconds, finished_at) VALUES (?,?,?,?,?)', batch)
+            except sqlite3.Error as e:
+                print(f'[leaderboard] dropped {len(batch)} runs: {e}')
+            finally:
+                with self._flushed:
+                    self._pending -= len(batch)
+                    self._flushed.notify_all()
+        if conn is not None:
+            conn.close()
@@ -0,0 +1,42 @@
+# ==========================
+# LEVEL LAYOUT
+# Seeded, entity-free description of a level. The same seed always gives
+# the same lot, so runs can be keyed and replayed by it.
+# ==========================
+
+import random
+
+OBSTACLE_ROWS = range(-40, 40, 10)
+OBSTACLE_LANES = (-4, -2, 0, 2, 4)
+PLANE_OBSTACLE_COUNT = 10
+
+
+def new_seed():
+    return random.getrandbits(32)
+
+
+class LevelLayout:
+    __slots__ = ('seed', 'car_obstacles', 'plane_obstacles')
+
+    def __init__(self, seed, car_obstacles, plane_obstacles):
+        self.seed = seed
+        self.car_obstacles = car_obstacles
+        self.plane_obstacles = plane_obstacles
+
+
+def generate_layout(seed):
+    rng = random.Random(seed)
+
+    # Car obstacles arranged in rows forcing path
+    car_obstacles = []
+    for z in OBSTACLE_ROWS:
+        gap_x = rng.choice(OBSTACLE_LANES)  # random gap
+        for x in OBSTACLE_LANES:
+            if x != gap_x:
+                car_obstacles.append((x, 0.5, z))
+
+    # Plane obstacles randomized in air
+    plane_obstacles = [(rng.uniform(-10,10), rng.uniform(2,8), rng.uniform(-30,40))
+                       for _ in range(PLANE_OBSTACLE_COUNT)]
+
+    return LevelLayout(seed, car_obstacles, plane_obstacles)
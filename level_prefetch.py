@@ -0,0 +1,73 @@
+# ==========================
+# LEVEL PREFETCH
+# While one level is played, the next is loaded (or baked), validated and
+# staged on a worker thread. A reset takes the staged level and queues
+# the one after it, so the frame thread never builds a level itself.
+# If staging fails, or every attempt is rejected, take() stages the
+# known-good fallback seed instead (or raises when there is none).
+# ==========================
+
+import queue, threading
+
+from level_layout import new_seed
+
+
+class StagingFailed(RuntimeError):
+    pass
+
+
+class _Failed:
+    __slots__ = ('error',)
+
+    def __init__(self, error):
+        self.error = error
+
+
+class LevelPrefetcher:
+    def __init__(self, stage, pick_seed=new_seed, validate=None, attempts=8, fallback=None):
+        # stage(seed) runs on the worker and returns whatever the game
+        # needs to swap a level in; validate(staged) may reject it, in
+        # which case another seed is tried (up to `attempts` times).
+        self.stage, self.pick_seed, self.validate = stage, pick_seed, validate
+        self.attempts, self.fallback = attempts, fallback
+        self.rejected = 0
+        self._jobs = queue.SimpleQueue()
+        self._ready = queue.SimpleQueue()
+        self._worker = threading.Thread(target=self._stage_loop, name='level-prefetch', daemon=True)
+        self._worker.start()
+        self._jobs.put(True)
+
+    # ===== Worker thread =====
+    def _stage_loop(self):
+        while self._jobs.get():
+            try:
+                self._ready.put(self._stage_valid())
+            except Exception as e:
+                self._ready.put(_Failed(e))
+
+    def _stage_valid(self):
+        for _ in range(self.attempts):
+            staged = self.stage(self.pick_seed())
+            if self.validate is None or self.validate(staged):
+                return staged
+            self.rejected += 1
+        raise StagingFailed(f'{self.attempts} levels in a row were rejected')
+
+    # ===== Frame thread =====
+    def ready(self):
+        return not self._ready.empty()
+
+    def take(self):
+        # Returns the staged level, only blocking if a reset beat the
+        # worker to it, and starts staging the next one.
+        staged = self._ready.get()
+        self._jobs.put(True)
+        if not isinstance(staged, _Failed):
+            return staged
+        if self.fallback is None:
+            raise staged.error
+        print(f'[prefetch] {staged.error!r}; loading seed {self.fallback}')
+        return self.stage(self.fallback)
+
+    def close(self):
+        self._jobs.put(False)
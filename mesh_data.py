@@ -0,0 +1,58 @@
+# ==========================
+# MESH DATA
+# Plain vertex / triangle lists for combined meshes, built without ursina
+# so they can be produced on worker threads and handed to Mesh() later.
+# ==========================
+
+from math import sin, cos, pi
+
+# Corner signs and outward normal of each box face
+BOX_FACES = (
+    (((-1,-1,-1), (-1, 1,-1), ( 1, 1,-1), ( 1,-1,-1)), ( 0, 0,-1)),
+    ((( 1,-1, 1), ( 1, 1, 1), (-1, 1, 1), (-1,-1, 1)), ( 0, 0, 1)),
+    (((-1,-1, 1), (-1, 1, 1), (-1, 1,-1), (-1,-1,-1)), (-1, 0, 0)),
+    ((( 1,-1,-1), ( 1, 1,-1), ( 1, 1, 1), ( 1,-1, 1)), ( 1, 0, 0)),
+    (((-1, 1,-1), (-1, 1, 1), ( 1, 1, 1), ( 1, 1,-1)), ( 0, 1, 0)),
+    (((-1,-1, 1), (-1,-1,-1), ( 1,-1,-1), ( 1,-1, 1)), ( 0,-1, 0)),
+)
+
+
+def box_mesh_data(boxes, offset=(0, 0, 0)):
+    # boxes: (cx, cy, cz, sx, sy, sz) with full sizes. Returns vertices,
+    # triangles and normals for all of them merged into one mesh.
+    ox, oy, oz = offset
+    vertices, triangles, normals = [], [], []
+    for cx, cy, cz, sx, sy, sz in boxes:
+        hx, hy, hz = sx/2, sy/2, sz/2
+        for corners, normal in BOX_FACES:
+            base = len(vertices)
+            for dx, dy, dz in corners:
+                vertices.append((cx + dx*hx - ox, cy + dy*hy - oy, cz + dz*hz - oz))
+                normals.append(normal)
+            triangles.append((base, base+1, base+2))
+            triangles.append((base, base+2, base+3))
+    return vertices, triangles, normals
+
+
+def sphere_mesh_data(spheres, offset=(0, 0, 0), rings=6, segments=10):
+    # spheres: (cx, cy, cz, radius). Low-poly UV spheres merged into one mesh.
+    ox, oy, oz = offset
+    unit = []
+    for r in range(rings + 1):
+        phi = pi * r / rings
+        for s in range(segments + 1):
+            theta = 2*pi * s / segments
+            unit.append((sin(phi)*cos(theta), cos(phi), sin(phi)*sin(theta)))
+    vertices, triangles, normals = [], [], []
+    for cx, cy, cz, radius in spheres:
+        base = len(vertices)
+        for nx, ny, nz in unit:
+            vertices.append((cx + nx*radius - ox, cy + ny*radius - oy, cz + nz*radius - oz))
+            normals.append((nx, ny, nz))
+        for r in range(rings):
+            for s in range(segments):
+                a = base + r*(segments + 1) + s
+                b = a + segments + 1
+                triangles.append((a, b, a+1))
+                triangles.append((a+1, b, b+1))
+    return vertices, triangles, normals
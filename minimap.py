@@ -0,0 +1,63 @@
+# ==========================
+# MINIMAP
+# CPU rasteriser for the minimap's static layer. A level is drawn once
+# into an RGBA byte buffer (top row = far end of the map) and uploaded as
+# a texture; only the vehicle markers move on top of it afterwards.
+# ==========================
+
+from math import sqrt
+
+
+class MinimapLayer:
+    def __init__(self, x0, z0, x1, z1, pixels_per_unit=2, background=(0, 0, 0, 0)):
+        self.x0, self.z0, self.x1, self.z1 = x0, z0, x1, z1
+        self.ppu = pixels_per_unit
+        self.width = max(1, int(round((x1 - x0) * pixels_per_unit)))
+        self.height = max(1, int(round((z1 - z0) * pixels_per_unit)))
+        self.pixels = bytearray(bytes(background) * (self.width * self.height))
+
+    def _span(self, j, lo, hi, rgba):
+        # Fills row j between world x lo and hi.
+        i0 = max(0, int(round((lo - self.x0) * self.ppu)))
+        i1 = min(self.width, int(round((hi - self.x0) * self.ppu)))
+        if i1 > i0:
+            o = (j*self.width + i0) * 4
+            self.pixels[o:o + (i1 - i0)*4] = bytes(rgba) * (i1 - i0)
+
+    def _rows(self, zmin, zmax):
+        # Pixel rows whose centres fall in [zmin, zmax], with those centres.
+        j0 = max(0, int((self.z1 - zmax) * self.ppu + 0.5))
+        j1 = min(self.height, int((self.z1 - zmin) * self.ppu + 0.5))
+        return ((j, self.z1 - (j + 0.5) / self.ppu) for j in range(j0, j1))
+
+    def rect(self, cx, cz, hx, hz, rgba):
+        for j, _ in self._rows(cz - hz, cz + hz):
+            self._span(j, cx - hx, cx + hx, rgba)
+
+    def circle(self, cx, cz, r, rgba):
+        for j, z in self._rows(cz - r, cz + r):
+            w = r*r - (z - cz)**2
+            if w > 0:
+                w = sqrt(w)
+                self._span(j, cx - w, cx + w, rgba)
+
+    def polygon(self, corners, rgba):
+        # Convex outline of (x, z) corners.
+        zs = [c[1] for c in corners]
+        n = len(corners)
+        for j, z in self._rows(min(zs), max(zs)):
+            xs = []
+            for k in range(n):
+                (ax, az), (bx, bz) = corners[k], corners[(k + 1) % n]
+                if (az <= z < bz) or (bz <= z < az):
+                    xs.append(ax + (bx - ax) * (z - az) / (bz - az))
+            if xs:
+                self._span(j, min(xs), max(xs), rgba)
+
+    def uv(self, x, z):
+        # World position -> quad-local offset in [-0.5, 0.5].
+        return (x - self.x0) / (self.x1 - self.x0) - 0.5, (z - self.z0) / (self.z1 - self.z0) - 0.5
+
+    def image(self):
+        from PIL import Image   # ships with ursina
+        return Image.frombytes('RGBA', (self.width, self.height), bytes(self.pixels))
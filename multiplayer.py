@@ -0,0 +1,443 @@
+# ==========================
+# MULTIPLAYER
+# Authoritative asyncio UDP server running LotSimulation headless, and a
+# client that sends held inputs and receives delta-compressed, quantized
+# snapshots which it interpolates for display.
+#
+#   python multiplayer.py --serve --port 7777      (dedicated server)
+#   python multiplayer.py --clients 32 --loss 0.1  (local server + bots)
+#   python "Car Game.py" --connect=host:7777       (ursina client)
+# ==========================
+
+import argparse, asyncio, atexit, random, struct, threading
+from collections import deque
+
+from headless_sim import LotSimulation, DRIVING, CRASHED, PARKED
+
+SNAPSHOT_RATE = 20
+HISTORY = 32            # snapshots the server keeps as delta bases
+CLIENT_TIMEOUT = 5
+JOIN_RETRY = 0.25
+INTERP_DELAY = 0.1
+PUBLISH_INTERVAL = 1/120    # how often a ThreadedClient refreshes its sample
+
+POS_SCALE = 100                 # centimetres
+ANGLE_SCALE = 65536 / 360       # full turn in 16 bits
+
+MSG_JOIN, MSG_WELCOME, MSG_INPUT, MSG_SNAPSHOT, MSG_LEAVE = 1, 2, 3, 4, 5
+
+JOIN = struct.Struct('<B')
+LEAVE = struct.Struct('<B')
+WELCOME = struct.Struct('<BHIIH')       # type, player id, seed, tick, tick rate
+INPUT = struct.Struct('<BIIbbB')        # type, input seq, acked snapshot tick, move, steer, brake
+SNAP_HEADER = struct.Struct('<BIIHH')   # type, tick, base tick, changed count, removed count
+ENTITY_HEADER = struct.Struct('<HB')    # player id, changed-field mask
+FIELD = struct.Struct('<h')
+REMOVED = struct.Struct('<H')
+
+FIELDS = 5      # x, y, z, heading, status
+STATUS_CODES = {DRIVING: 0, CRASHED: 1, PARKED: 2}
+STATUS_NAMES = {code: name for name, code in STATUS_CODES.items()}
+
+
+# ===== Quantization =====
+def _int16(v):
+    return max(-32768, min(32767, int(round(v))))
+
+
+def quantize(car):
+    s = car.state
+    heading = int(round((s.heading % 360) * ANGLE_SCALE)) % 65536
+    return (_int16(s.x*POS_SCALE), _int16(s.y*POS_SCALE), _int16(s.z*POS_SCALE),
+            heading - 65536 if heading > 32767 else heading, STATUS_CODES[car.status])
+
+
+def dequantize(q):
+    return (q[0]/POS_SCALE, q[1]/POS_SCALE, q[2]/POS_SCALE, (q[3]/ANGLE_SCALE) % 360, STATUS_NAMES[q[4]])
+
+
+# ===== Snapshot encoding =====
+def encode_snapshot(tick, current, base_tick=0, base=None):
+    # Only fields that differ from the acknowledged base are written.
+    base = base or {}
+    body = []
+    changed = 0
+    for pid, q in current.items():
+        old = base.get(pid)
+        mask = 0
+        for i in range(FIELDS):
+            if old is None or q[i] != old[i]:
+                mask |= 1 << i
+        if not mask:
+            continue
+        changed += 1
+        body.append(ENTITY_HEADER.pack(pid, mask))
+        for i in range(FIELDS):
+            if mask >> i & 1:
+                body.append(FIELD.pack(q[i]))
+    removed = [pid for pid in base if pid not in current]
+    for pid in removed:
+        body.append(REMOVED.pack(pid))
+    return SNAP_HEADER.pack(MSG_SNAPSHOT, tick, base_tick, changed, len(removed)) + b''.join(body)
+
+
+def decode_snapshot(data, bases):
+    # Returns (tick, states), or None when the delta base is unknown.
+    _, tick, base_tick, changed, removed = SNAP_HEADER.unpack_from(data)
+    if base_tick:
+        base = bases.get(base_tick)
+        if base is None:
+            return None
+        states = dict(base)
+    else:
+        states = {}
+    off = SNAP_HEADER.size
+    for _ in range(changed):
+        pid, mask = ENTITY_HEADER.unpack_from(data, off)
+        off += ENTITY_HEADER.size
+        vals = list(states.get(pid, (0,)*FIELDS))
+        for i in range(FIELDS):
+            if mask >> i & 1:
+                vals[i] = FIELD.unpack_from(data, off)[0]
+                off += FIELD.size
+        states[pid] = tuple(vals)
+    for _ in range(removed):
+        states.pop(REMOVED.unpack_from(data, off)[0], None)
+        off += REMOVED.size
+    return tick, states
+
+
+# ===== Network conditions =====
+class LossyTransport:
+    # Wraps a datagram transport to drop and delay outgoing packets, so a
+    # local session can rehearse bad networks.
+    def __init__(self, transport, loss=0, latency=0, jitter=0, rng=None):
+        self.transport = transport
+        self.loss, self.latency, self.jitter = loss, latency, jitter
+        self.rng = rng or random.Random()
+        self.loop = asyncio.get_event_loop()
+
+    def sendto(self, data, addr=None):
+        if self.loss and self.rng.random() < self.loss:
+            return
+        delay = self.latency + (self.rng.uniform(0, self.jitter) if self.jitter else 0)
+        if delay <= 0:
+            self.transport.sendto(data, addr)
+        else:
+            self.loop.call_later(delay, self._send_late, data, addr)
+
+    def _send_late(self, data, addr):
+        if not self.transport.is_closing():
+            self.transport.sendto(data, addr)
+
+    def close(self):
+        self.transport.close()
+
+
+# ===== Server =====
+class ClientSlot:
+    __slots__ = ('player_id', 'last_seq', 'ack_tick', 'last_heard')
+
+    def __init__(self, player_id, now):
+        self.player_id = player_id
+        self.last_seq = 0
+        self.ack_tick = 0
+        self.last_heard = now
+
+
+class GameServer(asyncio.DatagramProtocol):
+    def __init__(self, seed=None, loss=0, latency=0, jitter=0):
+        self.sim = LotSimulation(seed)
+        self.net = (loss, latency, jitter)
+        self.clients = {}
+        self.history = {}
+        self.free_ids = []
+        self.next_id = 0
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = LossyTransport(transport, *self.net)
+        self.loop = asyncio.get_event_loop()
+
+    def datagram_received(self, data, addr):
+        if not data:
+            return
+        kind = data[0]
+        slot = self.clients.get(addr)
+        if kind == MSG_JOIN:
+            if slot is None:
+                slot = self._join(addr)
+            self.transport.sendto(WELCOME.pack(MSG_WELCOME, slot.player_id, self.sim.layout.seed,
+                                               self.sim.tick, self.sim.tick_rate), addr)
+        elif slot is None:
+            return
+        elif kind == MSG_INPUT and len(data) == INPUT.size:
+            _, seq, ack, move, steer, brake = INPUT.unpack(data)
+            slot.last_heard = self.loop.time()
+            if seq > slot.last_seq:
+                slot.last_seq = seq
+                self.sim.set_input(slot.player_id, max(-1, min(1, move)), max(-1, min(1, steer)), brake)
+            if ack > slot.ack_tick:
+                slot.ack_tick = ack
+        elif kind == MSG_LEAVE:
+            self._drop(addr)
+
+    def _join(self, addr):
+        player_id = self.free_ids.pop() if self.free_ids else self.next_id
+        if player_id == self.next_id:
+            self.next_id += 1
+        slot = ClientSlot(player_id, self.loop.time())
+        self.clients[addr] = slot
+        self.sim.add_car(player_id)
+        return slot
+
+    def _drop(self, addr):
+        slot = self.clients.pop(addr, None)
+        if slot is not None:
+            self.sim.remove_car(slot.player_id)
+            self.free_ids.append(slot.player_id)
+
+    def broadcast(self):
+        tick = self.sim.tick
+        current = {car_id: quantize(car) for car_id, car in self.sim.cars.items()}
+        self.history[tick] = current
+        if len(self.history) > HISTORY:
+            del self.history[min(self.history)]
+
+        packets = {}
+        for addr, slot in self.clients.items():
+            base_tick = slot.ack_tick if slot.ack_tick in self.history else 0
+            packet = packets.get(base_tick)
+            if packet is None:
+                packet = packets[base_tick] = encode_snapshot(tick, current, base_tick, self.history.get(base_tick))
+            self.transport.sendto(packet, addr)
+
+    def expire_clients(self):
+        cutoff = self.loop.time() - CLIENT_TIMEOUT
+        for addr in [addr for addr, slot in self.clients.items() if slot.last_heard < cutoff]:
+            self._drop(addr)
+
+    async def run(self):
+        tick_time = 1 / self.sim.tick_rate
+        snapshot_every = max(1, self.sim.tick_rate // SNAPSHOT_RATE)
+        next_time = self.loop.time()
+        while True:
+            self.sim.step()
+            if self.sim.tick % snapshot_every == 0:
+                self.broadcast()
+            if self.sim.tick % self.sim.tick_rate == 0:
+                self.expire_clients()
+            next_time += tick_time
+            await asyncio.sleep(max(0, next_time - self.loop.time()))
+
+
+# ===== Client =====
+class Interpolator:
+    def __init__(self, delay=INTERP_DELAY, size=32):
+        self.delay = delay
+        self.frames = deque(maxlen=size)
+        self.offset = None
+
+    def push(self, server_time, states, now):
+        self.frames.append((server_time, states))
+        # Track server-minus-local time; jump forward at once, drift back slowly.
+        offset = server_time - now
+        if self.offset is None or offset > self.offset:
+            self.offset = offset
+        else:
+            self.offset += (offset - self.offset) * 0.05
+
+    def sample(self, now):
+        if not self.frames:
+            return {}
+        render = now + self.offset - self.delay
+        frames = self.frames
+        if render <= frames[0][0]:
+            return {pid: dequantize(q) for pid, q in frames[0][1].items()}
+        if render >= frames[-1][0]:
+            return {pid: dequantize(q) for pid, q in frames[-1][1].items()}
+        for i in range(len(frames) - 1, 0, -1):
+            t0, a = frames[i-1]
+            if t0 <= render:
+                t1, b = frames[i]
+                break
+        f = (render - t0) / (t1 - t0)
+        out = {}
+        for pid, qb in b.items():
+            qa = a.get(pid)
+            if qa is None or qa[4] != qb[4]:
+                out[pid] = dequantize(qb if f >= 0.5 or qa is None else qa)
+                continue
+            xa, ya, za, ha, status = dequantize(qa)
+            xb, yb, zb, hb, _ = dequantize(qb)
+            dh = (hb - ha + 180) % 360 - 180
+            out[pid] = (xa + (xb-xa)*f, ya + (yb-ya)*f, za + (zb-za)*f, (ha + dh*f) % 360, status)
+        return out
+
+
+class GameClient(asyncio.DatagramProtocol):
+    def __init__(self, loss=0, latency=0, jitter=0, interp_delay=INTERP_DELAY):
+        self.net = (loss, latency, jitter)
+        self.player_id = None
+        self.seed = None
+        self.tick_rate = None
+        self.snapshots = {}
+        self.latest_tick = 0
+        self.input_seq = 0
+        self.received = 0
+        self.received_bytes = 0
+        self.interpolator = Interpolator(interp_delay)
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = LossyTransport(transport, *self.net)
+        self.loop = asyncio.get_event_loop()
+        self.joined = asyncio.Event()
+
+    def datagram_received(self, data, addr):
+        if not data:
+            return
+        kind = data[0]
+        if kind == MSG_WELCOME and len(data) == WELCOME.size:
+            _, self.player_id, self.seed, _, self.tick_rate = WELCOME.unpack(data)
+            self.joined.set()
+        elif kind == MSG_SNAPSHOT and self.tick_rate:
+            decoded = decode_snapshot(data, self.snapshots)
+            if decoded is None or decoded[0] <= self.latest_tick:
+                return
+            tick, states = decoded
+            self.received += 1
+            self.received_bytes += len(data)
+            self.snapshots[tick] = states
+            if len(self.snapshots) > HISTORY:
+                del self.snapshots[min(self.snapshots)]
+            self.latest_tick = tick
+            self.interpolator.push(tick / self.tick_rate, states, self.loop.time())
+
+    async def connect(self, timeout=5):
+        deadline = self.loop.time() + timeout
+        while not self.joined.is_set():
+            if self.loop.time() > deadline:
+                raise TimeoutError('no welcome from server')
+            self.transport.sendto(JOIN.pack(MSG_JOIN))
+            try:
+                await asyncio.wait_for(self.joined.wait(), JOIN_RETRY)
+            except asyncio.TimeoutError:
+                pass
+
+    def send_input(self, move, steer, brake):
+        self.input_seq += 1
+        self.transport.sendto(INPUT.pack(MSG_INPUT, self.input_seq, self.latest_tick, move, steer, brake))
+
+    def sample(self):
+        # {player id: (x, y, z, heading, status)} at the interpolated render time.
+        return self.interpolator.sample(self.loop.time())
+
+    def leave(self):
+        self.transport.sendto(LEAVE.pack(MSG_LEAVE))
+        self.transport.close()
+
+
+class ThreadedClient:
+    # GameClient on its own event loop thread, for frame loops that aren't
+    # asyncio (the ursina games). Inputs are posted to the loop, and the
+    # loop publishes the interpolated sample behind a lock for the frame
+    # thread to read, so the client is only ever touched from one thread.
+    def __init__(self, host, port, timeout=5):
+        self._lock = threading.Lock()
+        self._latest = {}
+        self._publisher = None
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name='net-client', daemon=True)
+        self._thread.start()
+        self.client = self._call(self._open(host, port, timeout), timeout + 1)
+        self.player_id, self.seed = self.client.player_id, self.client.seed
+        atexit.register(self.close)
+
+    async def _open(self, host, port, timeout):
+        _, client = await self.loop.create_datagram_endpoint(GameClient, remote_addr=(host, port))
+        await client.connect(timeout)
+        self._publisher = asyncio.create_task(self._publish(client))
+        return client
+
+    async def _publish(self, client):
+        while True:
+            view = client.sample()
+            with self._lock:
+                self._latest = view
+            await asyncio.sleep(PUBLISH_INTERVAL)
+
+    def _call(self, coro, timeout):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result(timeout)
+
+    def send_input(self, move, steer, brake):
+        self.loop.call_soon_threadsafe(self.client.send_input, move, steer, brake)
+
+    def sample(self):
+        # Latest published view; never waits on the network thread.
+        with self._lock:
+            return self._latest
+
+    def close(self):
+        if self._thread.is_alive():
+            self.loop.call_soon_threadsafe(self._publisher.cancel)
+            self.loop.call_soon_threadsafe(self.client.leave)
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(1)
+
+
+# ===== Local session =====
+async def run_local_session(clients=24, seconds=5, loss=0.0, latency=0.0, jitter=0.0, seed=None):
+    loop = asyncio.get_running_loop()
+    server_transport, server = await loop.create_datagram_endpoint(
+        lambda: GameServer(seed, loss, latency, jitter), local_addr=('127.0.0.1', 0))
+    server_task = asyncio.create_task(server.run())
+    addr = server_transport.get_extra_info('sockname')
+
+    bots = []
+    for _ in range(clients):
+        _, client = await loop.create_datagram_endpoint(
+            lambda: GameClient(loss, latency, jitter), remote_addr=addr)
+        bots.append(client)
+    await asyncio.gather(*(bot.connect() for bot in bots))
+
+    rng = random.Random(0)
+    end = loop.time() + seconds
+    while loop.time() < end:
+        for bot in bots:
+            bot.send_input(1, rng.choice((-1, 0, 0, 1)), 0)
+        await asyncio.sleep(1/30)
+
+    for bot in bots:
+        view = bot.sample()
+        print(f"player {bot.player_id:3d}: {bot.received:4d} snapshots, "
+              f"{bot.received_bytes/max(bot.received, 1):6.1f} B avg, sees {len(view)} cars")
+    for bot in bots:
+        bot.leave()
+    server_task.cancel()
+    server_transport.close()
+
+
+async def serve(host, port, seed=None):
+    loop = asyncio.get_running_loop()
+    _, server = await loop.create_datagram_endpoint(lambda: GameServer(seed), local_addr=(host, port))
+    print(f'serving lot seed {server.sim.layout.seed} on {host}:{port}')
+    await server.run()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--serve', action='store_true')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=7777)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--clients', type=int, default=24)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--loss', type=float, default=0.0)
+    parser.add_argument('--latency', type=float, default=0.0)
+    parser.add_argument('--jitter', type=float, default=0.0)
+    args = parser.parse_args()
+    if args.serve:
+        asyncio.run(serve(args.host, args.port, args.seed))
+    else:
+        asyncio.run(run_local_session(args.clients, args.seconds, args.loss, args.latency, args.jitter, args.seed))
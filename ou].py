@@ -1,6 +1,10 @@
 from ursina import *
 from math import sin, cos, radians
-import random, time as systime
+import os, random, time as systime
+from camera_rig import CameraRig, RigProfile, CAMERA_MODES
+from parking import ParkingBay, ParkingEvaluator, gauge
+from leaderboard import Leaderboard
+from level_layout import new_seed
 
 app = Ursina()
 
@@ -50,8 +54,9 @@ message = Text('', origin=(0,0), scale=2, y=0.4, color=TEXT_COLOR, background=Tr
 speed_text = Text('Speed: 0', position=window.top_left + Vec2(0.1,-0.1), scale=1.5, color=SPEED_TEXT_COLOR)
 timer_text = Text('Time: 0.0', position=window.top_left + Vec2(0.1,-0.2), scale=1.5, color=color.azure)
 best_time_text = Text('Best: --', position=window.top_left + Vec2(0.1,-0.3), scale=1.5, color=color.yellow)
-mode_text = Text('Mode: Car (Cam: Locked-Fixed)', position=window.top_left + Vec2(0.1,-0.4), scale=1.2, color=color.cyan)
+mode_text = Text('Mode: Car (Cam: follow)', position=window.top_left + Vec2(0.1,-0.4), scale=1.2, color=color.cyan)
 zoom_text = Text('Zoom: 0', position=window.top_left + Vec2(0.1,-0.5), scale=1.2, color=color.pink)
+park_text = Text('Park: --', position=window.top_left + Vec2(0.1,-0.6), scale=1.2, color=PARKING_COLOR)
 controls_text = Text(
     text=(
         "Controls:\n"
@@ -66,6 +71,9 @@ controls_text = Text(
     background=False
 )
 
+# ===== Camera =====
+camera_rig = CameraRig()
+
 # ===== Car Class =====
 class Car(Entity):
     def __init__(self):
@@ -83,6 +91,7 @@ class Car(Entity):
         self.deceleration = 8
         self.steering = 40
         self.brake_force = 20
+        self.camera_profile = RigProfile(distance=10, height=5, orbit_radius=12, orbit_height=6)
 
     def reset(self):
         self.position = (0, 0.25, -45)
@@ -137,29 +146,36 @@ class Car(Entity):
         return False
 
     def update_camera(self, dt, camera_mode, zoom):
-        camera_distance = 10 + zoom
-        camera_height = 5 + zoom * 0.5
-        camera_position = self.position + Vec3(0, camera_height, -camera_distance)
-        camera.position = camera_position
-        camera.look_at(self.position + Vec3(0,1,0))
+        camera_rig.update(dt, self.camera_profile, camera_mode, self.x, self.y, self.z, self.rotation_y, zoom)
+        camera_rig.apply(camera)
 
 # ===== GameManager =====
+LEADERBOARD_MODE = 'classic-car'
+
 class GameManager:
     def __init__(self):
         self.car = Car()
 
         self.parking_spot = Entity(model='plane', scale=(3,1,4), color=PARKING_COLOR, position=(0,0,45))
-        self.parking_box = Entity(model='cube', scale=(2.8,0.5,3.8), position=(0,0.25,45), collider='box', visible=False)
+        # The 2x4 car only just fits the 3x4 bay, so allow half a metre of overhang.
+        self.parking_eval = ParkingEvaluator(ParkingBay.rectangle(0, 45, 3, 4), car_width=2, car_length=4, tolerance=0.5)
 
+        # Seeded so leaderboard runs can be compared per layout
+        self.level_seed = new_seed()
+        rng = random.Random(self.level_seed)
         self.obstacles = []
         for z in range(-25, 40, 8):
             for _ in range(2):
-                x_pos = random.choice([-4, -2, 0, 2, 4])
+                x_pos = rng.choice([-4, -2, 0, 2, 4])
                 self.obstacles.append(Entity(model='cube', color=OBSTACLE_COLOR, scale=(1,1,1), position=(x_pos, 0.5, z), collider='box'))
 
-        self.camera_mode = 'locked_fixed'
+        self.camera_mode = 'follow'
         self.start_time = None
-        self.best_time = None
+        # Shares Car Game.py's database under its own mode: the car and lot differ
+        self.leaderboard = Leaderboard(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'leaderboard.db'))
+        self.best_time = self.leaderboard.personal_best(LEADERBOARD_MODE)
+        if self.best_time is not None:
+            best_time_text.text = f"Best: {self.best_time:.1f}"
         self.zoom = 0
         self.game_running = False
 
@@ -167,6 +183,7 @@ class GameManager:
         message.text = ''
         self.start_time = systime.time()
         self.car.reset()
+        camera_rig.snap()
         self.parking_spot.color = PARKING_COLOR
         self.game_running = True
 
@@ -177,7 +194,7 @@ class GameManager:
         crashed = self.car.update_move(dt, self.obstacles)
         self.car.update_camera(dt, self.camera_mode, self.zoom)
         speed_text.text = f"Speed: {round(abs(self.car.speed),1)}"
-        mode_text.text = f"Mode: Car (Cam: {self.camera_mode.replace('_','-')})"
+        mode_text.text = f"Mode: Car (Cam: {self.camera_mode})"
         zoom_text.text = f"Zoom: {self.zoom}"
         elapsed = systime.time() - self.start_time if self.start_time else 0
         timer_text.text = f"Time: {elapsed:.1f}"
@@ -187,8 +204,11 @@ class GameManager:
         else:
             message.text = ''
 
-        if distance(self.car.position, self.parking_spot.position) < 2:
+        score = self.parking_eval.evaluate(self.car.x, self.car.z, self.car.rotation_y, abs(self.car.speed))
+        park_text.text = f"Park: {gauge(score.total)} {int(score.total*100)}%"
+        if score.parked:
             message.text = f"Car Parked! Time: {elapsed:.1f}"
+            self.leaderboard.record(self.level_seed, LEADERBOARD_MODE, elapsed)
             if self.best_time is None or elapsed < self.best_time:
                 self.best_time = elapsed
             best_time_text.text = f"Best: {self.best_time:.1f}"
@@ -196,10 +216,6 @@ class GameManager:
 
 game_manager = GameManager()
 
-# ===== Utility =====
-def distance(a, b):
-    return (a - b).length()
-
 # ===== Input Handling =====
 def input(key):
     if not app.game_started:
@@ -208,9 +224,8 @@ def input(key):
     if key == 'r':
         game_manager.reset()
     if key == 'v':
-        modes = ['locked_fixed', 'locked_follow', 'chase', 'cinematic']
-        idx = modes.index(game_manager.camera_mode)
-        game_manager.camera_mode = modes[(idx+1) % len(modes)]
+        idx = CAMERA_MODES.index(game_manager.camera_mode)
+        game_manager.camera_mode = CAMERA_MODES[(idx+1) % len(CAMERA_MODES)]
     if key == 'scroll up':
         game_manager.zoom = clamp(game_manager.zoom - 1, -10, 20)
     if key == 'scroll down':
@@ -5,7 +5,20 @@
 
 from ursina import *
 import math
+import os
 import random
+import time as systime
+from parking import ParkingBay, ParkingEvaluator, gauge
+from timers import TimerWheel
+from game_state import StateMachine, MENU, PLAYING, PARKED, RESETTING
+from scene_scope import SceneScope
+from diagnostics import Diagnostics, scene_probes, heap_probes, timer_probes
+from minimap import MinimapLayer
+from placement import PropPlacer
+from bay_index import BayIndex, bay_row
+from mesh_data import box_mesh_data
+from component_store import (ComponentStore, ViewSync, SOLID, MOVING, WANDER,
+                             wander_system, movement_system, overlap_system, cull_system)
 
 app = Ursina()
 
@@ -24,6 +37,41 @@ walls = []
 trees = []
 ai_cars = []
 info_text = None
+park_text = None
+minimap = None
+minimap_markers = []
+parked_cars = {}    # bay id -> parked AI car
+
+# Walls, trees, AI and parked cars are rows in the component store; the
+# systems run on its columns and the entities above are synced once a frame.
+world = ComponentStore()
+views = ViewSync(world)
+CULL_DISTANCE, CULL_NEAR, CULL_HALF_ANGLE = 45, 12, 70
+
+timers = TimerWheel()
+game_state = StateMachine(MENU)
+
+# Every entity of a play session lives in this scope and is released with it.
+# Debug mode reports anything left behind after a round trip to the menu.
+game_scope = SceneScope('game', destroy, live_entities=lambda: scene.entities, debug=True)
+
+# Counts sampled every half second while F3 shows them; F4 dumps them to JSON.
+# A checkpoint on every return to the menu flags anything that keeps growing.
+diagnostics = Diagnostics({**scene_probes(scene, lambda: application.sequences, Text),
+                           **timer_probes(lambda: [timers]), **heap_probes()})
+diag_text = Text('', position=window.top_right + Vec2(-0.4, -0.1), scale=1, color=color.white,
+                 background=True, enabled=False)
+
+PLAYER_SPAWN = (0, 0.25, -10)
+
+# Bay 0 is the original green zone; two rows of bays line the north side.
+# The evaluator is pointed at whichever free bay is nearest the player.
+BAY_TRAFFIC_INTERVAL = 2.5
+PARKED_SHARE = 0.4
+bay_index = BayIndex([ParkingBay.rectangle(10, 0, 3, 6, both_ways=True)] +
+                     bay_row(-21, 18.5, 14, 3, 6, both_ways=True) +
+                     bay_row(-21, 11.5, 14, 3, 6, both_ways=True))
+park_eval = ParkingEvaluator(bay_index.bays[0], car_width=1, car_length=2)
 
 
 # ===========================================================
@@ -80,73 +128,100 @@ def show_settings_menu():
 # GAME ENVIRONMENT
 # ===========================================================
 def create_game_scene():
-    global player, sun, ambient, park_zone, walls, ai_cars, trees, info_text
+    global player, sun, ambient, park_zone, walls, ai_cars, trees, info_text, park_text
+    add = game_scope.open().add
 
     # Ground
-    ground = Entity(model='plane', scale=60, color=color.gray, collider='box')
+    add(Entity(model='plane', scale=60, color=color.gray))
 
-    # Parking zone
-    park_zone = Entity(model='cube', color=color.lime, scale=(3, 0.05, 6), position=(10, 0, 0))
+    # Parking bays: painted once as a merged mesh; the green zone marks the target bay
+    paint = [(b.cx, 0.01, b.cz, 2.8, 0.02, 5.8) for b in bay_index.bays]
+    vertices, triangles, normals = box_mesh_data(paint)
+    add(Entity(model=Mesh(vertices=vertices, triangles=triangles, normals=normals), color=color.light_gray))
+    park_zone = add(Entity(model='cube', color=color.lime, scale=(3, 0.05, 6), position=(10, 0.02, 0)))
 
     # Walls / Boundaries
     walls.clear()
+    world.clear()
+    views.clear()
     for pos in [(-25, 1, 0), (25, 1, 0), (0, 1, -25), (0, 1, 25)]:
-        wall = Entity(model='cube', color=color.dark_gray,
-                      scale=(1, 2, 50) if abs(pos[0]) > 0 else (50, 2, 1),
-                      position=pos, collider='box')
+        wall = add(Entity(model='cube', color=color.dark_gray,
+                          scale=(1, 2, 50) if abs(pos[0]) > 0 else (50, 2, 1),
+                          position=pos))
+        views.bind(world.spawn(pos, (wall.scale_x / 2, 1, wall.scale_z / 2)), wall)
         walls.append(wall)
 
-    # Trees (decorations)
-    trees.clear()
-    for i in range(15):
-        x = random.randint(-20, 20)
-        z = random.randint(-20, 20)
-        trunk = Entity(model='cube', color=color.brown, scale=(0.3, 2, 0.3), position=(x, 1, z))
-        leaves = Entity(model='sphere', color=color.green, scale=1.8, position=(x, 2.5, z))
-        trees.extend([trunk, leaves])
+    # Props are Poisson-disk placed: clear of each other, the spawn and the bays
+    placer = PropPlacer(-24, -24, 24, 24, seed=random.getrandbits(32))
+    placer.exclude_circle(PLAYER_SPAWN[0], PLAYER_SPAWN[2], 4)
+    bay = bay_index.bays[0]
+    placer.exclude_rect(bay.cx, bay.cz, 2.5, 4)
+    placer.exclude_rect(0, 15, 22, 7.5)
+
+    create_bay_traffic(add)
 
     # AI Cars
     ai_cars.clear()
-    for i in range(3):
-        pos = (random.randint(-10, 10), 0.25, random.randint(-10, 10))
-        car = Entity(model='cube', color=color.azure, scale=(1, 0.5, 2), position=pos, collider='box')
+    for x, z in placer.place(1.2, count=3, spacing=5, bounds=(-10, -10, 10, 10)):
+        car = add(Entity(model='cube', color=color.azure, scale=(1, 0.5, 2), position=(x, 0.25, z)))
+        row = world.spawn((x, 0.25, z), (0.5, 0.25, 1), SOLID | MOVING | WANDER, phase=random.uniform(0, 2 * math.pi))
+        views.bind(row, car)
         ai_cars.append(car)
 
+    # Trees (decorations)
+    trees.clear()
+    for x, z in placer.place(0.9, count=15, spacing=4):
+        trunk = add(Entity(model='cube', color=color.brown, scale=(0.3, 2, 0.3), position=(x, 1, z)))
+        leaves = add(Entity(model='sphere', color=color.green, scale=1.8, position=(x, 2.5, z)))
+        views.bind(world.spawn((x, 1, z), (0.9, 1.5, 0.9), 0), trunk, leaves)
+        trees.extend([trunk, leaves])
+
     # Player Car
-    player = Entity(model='cube', color=color.red, scale=(1, 0.5, 2), position=(0, 0.25, -10), collider='box')
+    player = add(Entity(model='cube', color=color.red, scale=(1, 0.5, 2), position=PLAYER_SPAWN))
     # Wheels
     for wx, wz in [(-0.4, 0.9), (0.4, 0.9), (-0.4, -0.9), (0.4, -0.9)]:
         Entity(model='cylinder', color=color.black, scale=(0.3, 0.3, 0.3),
                position=(player.x + wx, 0.15, player.z + wz), rotation_x=90, parent=player)
 
-    # Camera setup
+    # Camera setup (handed back to the scene before the player is destroyed)
     camera.parent = player
+    game_scope.on_release(lambda: setattr(camera, 'parent', scene))
     camera.position = (0, 3, -8)
     camera.rotation_x = 15
 
     # Lights (sun & ambient)
-    sun = DirectionalLight()
+    sun = add(DirectionalLight())
     sun.look_at(Vec3(1, -1, -1))
-    ambient = AmbientLight(color=color.rgb(150, 150, 150))
+    ambient = add(AmbientLight(color=color.rgb(150, 150, 150)))
 
     # Info text
-    info_text = Text("Use W, A, S, D | Park in the green zone | Avoid AI Cars", y=0.45, scale=1.2, color=color.white)
+    info_text = add(Text("Use W, A, S, D | Park in the nearest free bay (green) | Avoid AI Cars", y=0.45, scale=1.2, color=color.white))
+    park_text = add(Text("Park: --", y=0.4, scale=1.2, color=color.lime))
+
+    create_minimap(add)
 
     # Cinematic start
     cinematic_intro()
 
-    # Start AI movement
-    invoke(move_ai_cars, delay=1)
+    views.sync()
+    game_state.enter(PLAYING)
 
-    # Run update loop
-    def update():
-        handle_player_movement()
-        handle_collisions()
-        update_day_night()
-        move_ai_cars()
-        check_parking()
 
-    app.run()
+# ===========================================================
+# UPDATE LOOP
+# ===========================================================
+def update():
+    timers.advance(time.dt)
+    if diagnostics.update(time.dt, diag_text.enabled):
+        diag_text.text = diagnostics.format()
+    if game_state.state != PLAYING:
+        return
+    handle_player_movement()
+    handle_collisions()
+    update_day_night()
+    run_systems()
+    update_minimap()
+    check_parking()
 
 
 # ===========================================================
@@ -170,37 +245,143 @@ def handle_player_movement():
 # COLLISIONS
 # ===========================================================
 def handle_collisions():
-    for obj in walls + ai_cars + trees:
-        if hasattr(obj, 'collider') and player.intersects(obj).hit:
-            player.position -= player.forward * 0.2  # bounce back
-            Audio('assets/hit.wav', autoplay=True) if hasattr(Audio, '__call__') else None
+    # Player footprint against every solid row at once
+    for _ in overlap_system(world, player.x, player.z, 0.5, 1.0, player.rotation_y):
+        player.position -= player.forward * 0.2  # bounce back
+        Audio('assets/hit.wav', autoplay=True, auto_destroy=True) if hasattr(Audio, '__call__') else None
 
 
 # ===========================================================
-# AI CARS MOVEMENT
+# SYSTEMS (AI movement, culling, view sync)
 # ===========================================================
-def move_ai_cars():
-    for car in ai_cars:
-        car.x += math.sin(time.time() + id(car)) * 0.02  # small left-right movement
-        car.z += math.cos(time.time() + id(car)) * 0.02  # small front-back movement
+def run_systems():
+    wander_system(world, time.time())
+    movement_system(world, time.dt)
+    eye, look = camera.world_position, camera.forward
+    changed = cull_system(world, eye.x, eye.z, look.x, look.z, CULL_HALF_ANGLE, CULL_DISTANCE, CULL_NEAR)
+    views.sync(changed)
+
+
+# ===========================================================
+# MINIMAP
+# ===========================================================
+def create_minimap(add):
+    # Ground, walls, trees and the green zone are drawn once into a texture;
+    # only the car markers move each frame.
+    global minimap
+    layer = MinimapLayer(-30, -30, 30, 30, pixels_per_unit=2, background=(30, 30, 30, 200))
+    layer.rect(0, 0, 30, 30, (120, 120, 120, 255))
+    for wall in walls:
+        layer.rect(wall.x, wall.z, wall.scale_x / 2, wall.scale_z / 2, (40, 40, 40, 255))
+    for bay in bay_index.bays:
+        layer.polygon(bay.corners, (170, 170, 170, 255))
+    for leaves in trees[1::2]:
+        layer.circle(leaves.x, leaves.z, leaves.scale_x / 2, (40, 140, 40, 255))
+
+    minimap = add(Entity(parent=camera.ui, model='quad', texture=Texture(layer.image()), scale=0.25,
+                         position=window.bottom_right + Vec2(-0.15, 0.15), z=0))
+    minimap.texture.filtering = None
+    minimap.layer = layer
+
+    minimap_markers.clear()
+    tracked = ([(park_zone, color.lime)] + [(car, color.azure) for car in ai_cars] +
+               [(car, color.light_gray) for car in parked_cars.values()] + [(player, color.red)])
+    for target, marker_color in tracked:
+        marker = add(Entity(parent=camera.ui, model='quad', color=marker_color, scale=(0.008, 0.016), z=-0.01))
+        minimap_markers.append((target, marker))
+
+
+def update_minimap():
+    for target, marker in minimap_markers:
+        u, v = minimap.layer.uv(target.x, target.z)
+        marker.x = minimap.x + u * minimap.scale_x
+        marker.y = minimap.y + v * minimap.scale_y
+        marker.rotation_z = target.rotation_y
+
+
+# ===========================================================
+# BAY TRAFFIC
+# ===========================================================
+def create_bay_traffic(add):
+    # A share of the bays starts occupied; the cars are reused as they move.
+    for b in range(len(bay_index.bays)):
+        bay_index.set_free(b, True)
+    parked_cars.clear()
+    for b in random.sample(range(1, len(bay_index.bays)), int(len(bay_index.bays) * PARKED_SHARE)):
+        car = add(Entity(model='cube', color=color.light_gray, scale=(1, 0.5, 2)))
+        car.row = world.spawn(car.position, (0.5, 0.25, 1))
+        views.bind(car.row, car)
+        park_car(car, b)
+    timers.schedule('bay_traffic', BAY_TRAFFIC_INTERVAL, bay_traffic)
+
+
+def park_car(car, b):
+    bay = bay_index.bays[b]
+    world.place(car.row, bay.cx, 0.25, bay.cz, bay.heading)
+    parked_cars[b] = car
+    bay_index.set_free(b, False)
+
+
+def bay_traffic():
+    # One parked car leaves and another pulls into a free bay the player isn't in.
+    if game_state.state != PLAYING or not parked_cars:
+        return
+    leaving = random.choice(list(parked_cars))
+    car = parked_cars.pop(leaving)
+    bay_index.set_free(leaving, True)
+    taken = bay_index.bay_at(player.x, player.z)
+    free = [b for b in range(1, len(bay_index.bays)) if bay_index.free[b] and b not in (leaving, taken)]
+    park_car(car, random.choice(free) if free else leaving)
+    timers.schedule('bay_traffic', BAY_TRAFFIC_INTERVAL, bay_traffic)
 
 
 # ===========================================================
 # PARKING SUCCESS
 # ===========================================================
 def check_parking():
-    if distance(player.position, park_zone.position) < 1.5:
-        Text("✅ YOU PARKED SUCCESSFULLY!", origin=(0, 0), y=0.3, scale=2, color=color.lime, duration=3)
-        invoke(return_to_menu, delay=4)
+    # Aim for the nearest free bay; the green zone follows it
+    target = bay_index.nearest_free(player.x, player.z)
+    if target >= 0 and bay_index.bays[target] is not park_eval.bay:
+        bay = park_eval.bay = bay_index.bays[target]
+        park_zone.position = (bay.cx, 0.02, bay.cz)
+        park_zone.rotation_y = bay.heading
+    speed = 5 if held_keys['w'] or held_keys['s'] else 0
+    score = park_eval.evaluate(player.x, player.z, player.rotation_y, speed)
+    park_text.text = f"Park: {gauge(score.total)} {int(score.total*100)}%"
+    if score.parked and game_state.enter(PARKED):
+        game_scope.add(Text("✅ YOU PARKED SUCCESSFULLY!", origin=(0, 0), y=0.3, scale=2, color=color.lime))
+        timers.schedule('menu', 4, return_to_menu)
 
 
 def return_to_menu():
-    destroy(player)
-    destroy(sun)
-    destroy(ambient)
-    for o in walls + trees + ai_cars:
-        destroy(o)
+    global player, sun, ambient, park_zone, info_text, park_text, minimap
+    game_state.enter(RESETTING)
+    timers.cancel('menu')
+    timers.cancel('bay_traffic')
+    game_scope.release()
+    player = sun = ambient = park_zone = info_text = park_text = minimap = None
+    minimap_markers.clear()
+    parked_cars.clear()
+    walls.clear()
+    trees.clear()
+    ai_cars.clear()
+    world.clear()
+    views.clear()
+    game_state.enter(MENU)
     create_main_menu()
+    diagnostics.checkpoint('menu')
+
+
+def input(key):
+    if key == 'f3':
+        diag_text.enabled = not diag_text.enabled
+        if diag_text.enabled:
+            diagnostics.sample(full=True)
+            diag_text.text = diagnostics.format()
+    if key == 'f4':
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'diagnostics',
+                            systime.strftime('diag-%Y%m%d-%H%M%S.json'))
+        print('Diagnostics written to', diagnostics.dump(path))
 
 
 # ===========================================================
@@ -0,0 +1,102 @@
+# ==========================
+# PARKING
+# One evaluator for every game: the car footprint is tested against the
+# bay polygon analytically and graded on containment, centering,
+# alignment and final speed. Cheap enough to run every tick.
+# ==========================
+
+from math import sin, cos, radians, sqrt
+
+
+class ParkingBay:
+    # Convex bay outline on the ground plane, given as (x, z) corners in
+    # counter-clockwise or clockwise order.
+    __slots__ = ('corners', 'edges', 'cx', 'cz', 'heading', 'both_ways')
+
+    def __init__(self, corners, heading=0, both_ways=False):
+        self.corners = tuple(corners)
+        self.heading = heading
+        self.both_ways = both_ways
+        n = len(self.corners)
+        self.cx = sum(c[0] for c in self.corners) / n
+        self.cz = sum(c[1] for c in self.corners) / n
+        # Outward unit normal and offset of every edge: n.p - d > 0 is outside.
+        edges = []
+        for i in range(n):
+            ax, az = self.corners[i]
+            bx, bz = self.corners[(i+1) % n]
+            nx, nz = bz - az, ax - bx
+            length = sqrt(nx*nx + nz*nz)
+            nx, nz = nx/length, nz/length
+            if nx*(self.cx-ax) + nz*(self.cz-az) > 0:
+                nx, nz = -nx, -nz
+            edges.append((nx, nz, nx*ax + nz*az))
+        self.edges = tuple(edges)
+
+    @classmethod
+    def rectangle(cls, cx, cz, width, length, heading=0, both_ways=False):
+        a = radians(heading)
+        s, c = sin(a), cos(a)
+        hw, hl = width/2, length/2
+        corners = [(cx + c*rx + s*rz, cz - s*rx + c*rz)
+                   for rx, rz in ((-hw, -hl), (hw, -hl), (hw, hl), (-hw, hl))]
+        return cls(corners, heading, both_ways)
+
+
+class ParkingScore:
+    __slots__ = ('inside', 'parked', 'containment', 'centering', 'alignment', 'speed', 'total')
+
+    def __init__(self):
+        self.inside = self.parked = False
+        self.containment = self.centering = self.alignment = self.speed = self.total = 0.0
+
+
+class ParkingEvaluator:
+    def __init__(self, bay, car_width, car_length, max_angle=15, max_speed=2,
+                 tolerance=0.0, weights=(0.4, 0.25, 0.25, 0.1)):
+        self.bay = bay
+        self.hw, self.hl = car_width/2, car_length/2
+        self.max_angle = max_angle
+        self.max_speed = max_speed
+        self.tolerance = tolerance
+        self.weights = weights
+        # Centering falls to zero when the car centre is a car-width off.
+        self.max_offset = max(car_width, 0.5)
+        self.score = ParkingScore()
+
+    def evaluate(self, x, z, heading, speed):
+        # Fills and returns self.score; the object is reused every call.
+        bay, score = self.bay, self.score
+        a = radians(heading)
+        s, c = sin(a), cos(a)
+        fx, fz = s*self.hl, c*self.hl
+        rx, rz = c*self.hw, -s*self.hw
+
+        excess = -1e9
+        for nx, nz, d in bay.edges:
+            # Farthest footprint corner along this edge normal.
+            reach = nx*x + nz*z + abs(nx*fx + nz*fz) + abs(nx*rx + nz*rz) - d
+            if reach > excess:
+                excess = reach
+        score.inside = excess <= self.tolerance
+        score.containment = 1.0 if score.inside else max(0.0, 1 - (excess - self.tolerance) / self.hw)
+
+        dx, dz = x - bay.cx, z - bay.cz
+        score.centering = max(0.0, 1 - sqrt(dx*dx + dz*dz) / self.max_offset)
+
+        diff = abs((heading - bay.heading + 180) % 360 - 180)
+        if bay.both_ways:
+            diff = min(diff, 180 - diff)
+        score.alignment = max(0.0, 1 - diff / self.max_angle)
+
+        score.speed = max(0.0, 1 - speed / self.max_speed)
+
+        w0, w1, w2, w3 = self.weights
+        score.total = score.containment * (w0 + w1*score.centering + w2*score.alignment + w3*score.speed)
+        score.parked = score.inside and diff < self.max_angle and speed < self.max_speed
+        return score
+
+
+def gauge(value, width=10):
+    filled = int(round(value * width))
+    return '█' * filled + '░' * (width - filled)
@@ -0,0 +1,85 @@
+# ==========================
+# PARTICLES
+# Fixed-capacity emitters keep particle state in preallocated arrays with
+# the live particles packed at the front (dead ones are swap-removed), and
+# a shared budget caps how many are alive across all emitters. Nothing is
+# allocated per particle; the renderer just reads the arrays.
+# ==========================
+
+import random
+from array import array
+
+
+class ParticleEmitter:
+    def __init__(self, capacity, lifetime, gravity=0.0, drag=0.0, seed=None):
+        self.capacity = capacity
+        self.lifetime = lifetime
+        self.gravity, self.drag = gravity, drag
+        self.alive = 0
+        self.carry = 0.0    # fractional particles owed by emit_rate
+        (self.x, self.y, self.z, self.vx, self.vy, self.vz,
+         self.age) = [array('d', [0.0]) * capacity for _ in range(7)]
+        self.rng = random.Random(seed)
+
+    def emit(self, n, x, y, z, vx, vy, vz, spread):
+        # Velocities are (vx, vy, vz) plus uniform jitter of +-spread per axis.
+        n = min(n, self.capacity - self.alive)
+        u = self.rng.uniform
+        for i in range(self.alive, self.alive + n):
+            self.x[i], self.y[i], self.z[i] = x, y, z
+            self.vx[i] = vx + u(-spread, spread)
+            self.vy[i] = vy + u(-spread, spread)
+            self.vz[i] = vz + u(-spread, spread)
+            self.age[i] = 0.0
+        self.alive += n
+        return n
+
+    def step(self, dt):
+        k = max(0.0, 1 - self.drag*dt)
+        g = self.gravity * dt
+        x, y, z, vx, vy, vz, age = self.x, self.y, self.z, self.vx, self.vy, self.vz, self.age
+        i = 0
+        while i < self.alive:
+            age[i] += dt
+            if age[i] >= self.lifetime:
+                last = self.alive - 1
+                x[i], y[i], z[i] = x[last], y[last], z[last]
+                vx[i], vy[i], vz[i], age[i] = vx[last], vy[last], vz[last], age[last]
+                self.alive = last
+                continue
+            vx[i] *= k
+            vy[i] = vy[i]*k - g
+            vz[i] *= k
+            x[i] += vx[i]*dt
+            y[i] += vy[i]*dt
+            z[i] += vz[i]*dt
+            i += 1
+
+
+class ParticleSystem:
+    def __init__(self, budget=512):
+        self.budget = budget
+        self.emitters = {}
+
+    def add(self, name, emitter):
+        self.emitters[name] = emitter
+        return emitter
+
+    def alive(self):
+        return sum(e.alive for e in self.emitters.values())
+
+    def emit(self, name, n, x, y, z, vx=0.0, vy=0.0, vz=0.0, spread=1.0):
+        n = min(n, self.budget - self.alive())
+        return self.emitters[name].emit(n, x, y, z, vx, vy, vz, spread) if n > 0 else 0
+
+    def emit_rate(self, name, rate, dt, x, y, z, vx=0.0, vy=0.0, vz=0.0, spread=1.0):
+        # Continuous emission at `rate` particles per second.
+        e = self.emitters[name]
+        e.carry += rate * dt
+        n = int(e.carry)
+        e.carry -= n
+        return self.emit(name, n, x, y, z, vx, vy, vz, spread) if n else 0
+
+    def step(self, dt):
+        for e in self.emitters.values():
+            e.step(dt)
@@ -0,0 +1,154 @@
+# ==========================
+# PLACEMENT
+# Seeded Poisson-disk prop placement (Bridson, with candidates on the
+# annulus edge) over a background grid. Each call places one layer of
+# props that keeps clear of exclusion zones and of every earlier layer,
+# so trees never land on cars, spawns or the parking zone.
+# ==========================
+
+import random
+from math import sqrt, sin, cos, pi, ceil
+
+TAU = 2*pi
+CANDIDATES = 12
+EPSILON = 1e-6
+
+
+PAD = 2    # empty border cells, so neighbour lookups never need clamping
+
+
+class _Layer:
+    # Background grid with cells of spacing / sqrt(2): at most one point
+    # per cell, and any point closer than `spacing` is in the 5x5 block
+    # around a candidate's cell, minus its corners.
+    __slots__ = ('radius', 'cell', 'x0', 'z0', 'stride', 'rows', 'grid', 'xs', 'zs', 'near')
+
+    def __init__(self, radius, cell, x0, z0, x1, z1):
+        self.radius, self.cell = radius, cell
+        self.x0, self.z0 = x0 - PAD*cell, z0 - PAD*cell
+        self.stride = int((x1 - x0) / cell) + 1 + 2*PAD
+        self.rows = int((z1 - z0) / cell) + 1 + 2*PAD
+        self.grid = [-1] * (self.stride * self.rows)   # point index per cell
+        self.xs, self.zs = [], []
+        # Flat offsets of the cells that can hold a point within `spacing`,
+        # nearest first so most rejections stop early
+        cells = [(di*di + dj*dj, dj*self.stride + di)
+                 for dj in range(-PAD, PAD + 1) for di in range(-PAD, PAD + 1) if abs(di) + abs(dj) < 2*PAD]
+        self.near = tuple(o for _, o in sorted(cells))
+
+    def index(self, x, z):
+        return int((z - self.z0) / self.cell) * self.stride + int((x - self.x0) / self.cell)
+
+    def add(self, x, z):
+        self.grid[self.index(x, z)] = len(self.xs)
+        self.xs.append(x)
+        self.zs.append(z)
+
+    def clear_of(self, x, z, distance):
+        # True if no point of this layer lies within `distance` of (x, z).
+        cell, stride, grid, xs, zs = self.cell, self.stride, self.grid, self.xs, self.zs
+        i, j = int((x - self.x0) / cell), int((z - self.z0) / cell)
+        reach = ceil(distance / cell)
+        d2 = distance * distance
+        for jj in range(max(j - reach, 0), min(j + reach + 1, self.rows)):
+            row = jj * stride
+            for ii in range(max(i - reach, 0), min(i + reach + 1, stride)):
+                p = grid[row + ii]
+                if p >= 0:
+                    dx, dz = xs[p] - x, zs[p] - z
+                    if dx*dx + dz*dz < d2:
+                        return False
+        return True
+
+
+class PropPlacer:
+    def __init__(self, x0, z0, x1, z1, seed=None):
+        self.bounds = (x0, z0, x1, z1)
+        self.rng = random.Random(seed)
+        self.circles = []   # (x, z, radius)
+        self.rects = []     # (cx, cz, half x, half z)
+        self.layers = []
+
+    def exclude_circle(self, x, z, radius):
+        self.circles.append((x, z, radius))
+
+    def exclude_rect(self, cx, cz, hx, hz):
+        self.rects.append((cx, cz, hx, hz))
+
+    def _free(self, x, z, r):
+        for cx, cz, cr in self.circles:
+            d = cr + r
+            if (x - cx)**2 + (z - cz)**2 < d*d:
+                return False
+        for cx, cz, hx, hz in self.rects:
+            if abs(x - cx) < hx + r and abs(z - cz) < hz + r:
+                return False
+        for layer in self.layers:
+            if not layer.clear_of(x, z, layer.radius + r):
+                return False
+        return True
+
+    def place(self, radius, count=None, spacing=None, bounds=None, k=CANDIDATES):
+        # Props of footprint `radius`, at least `spacing` apart (default:
+        # touching). With `count`, a random subset of the full sample is
+        # kept so the props spread over the whole area. Returns [(x, z)].
+        spacing = max(spacing or 2*radius, 2*radius)
+        bx0, bz0, bx1, bz1 = bounds or self.bounds
+        bx0, bz0, bx1, bz1 = bx0 + radius, bz0 + radius, bx1 - radius, bz1 - radius
+        cell = spacing / sqrt(2)
+        layer = _Layer(radius, cell, bx0, bz0, bx1, bz1)
+        xs, zs, grid, near = layer.xs, layer.zs, layer.grid, layer.near
+        gx0, gz0, stride = layer.x0, layer.z0, layer.stride
+        rng = self.rng
+        step = spacing * (1 + EPSILON)
+        s2 = spacing * spacing
+        # Unit directions of the k candidates around a point, rotated per point
+        ring = [(cos(TAU * t / k), sin(TAU * t / k)) for t in range(k)]
+        free = self._free if self.circles or self.rects or self.layers else None
+
+        active = []
+        for _ in range(k * 10):
+            x, z = rng.uniform(bx0, bx1), rng.uniform(bz0, bz1)
+            if free is None or free(x, z, radius):
+                layer.add(x, z)
+                active.append(0)
+                break
+
+        while active:
+            a = rng.randrange(len(active))
+            p = active[a]
+            px, pz = xs[p], zs[p]
+            theta = rng.random() * TAU
+            c, s = cos(theta)*step, sin(theta)*step
+            for ux, uz in ring:
+                x, z = px + ux*c - uz*s, pz + ux*s + uz*c
+                if not (bx0 <= x <= bx1 and bz0 <= z <= bz1):
+                    continue
+                base = int((z - gz0) / cell) * stride + int((x - gx0) / cell)
+                if grid[base] >= 0:
+                    continue
+                for o in near:
+                    q = grid[base + o]
+                    if q >= 0:
+                        dx, dz = xs[q] - x, zs[q] - z
+                        if dx*dx + dz*dz < s2:
+                            break
+                else:
+                    if free is None or free(x, z, radius):
+                        grid[base] = len(xs)
+                        xs.append(x)
+                        zs.append(z)
+                        active.append(len(xs) - 1)
+                        break
+            else:
+                active[a] = active[-1]
+                active.pop()
+
+        points = list(zip(xs, zs))
+        if count is not None and count < len(points):
+            points = [points[i] for i in sorted(rng.sample(range(len(points)), count))]
+            layer = _Layer(radius, cell, bx0, bz0, bx1, bz1)
+            for x, z in points:
+                layer.add(x, z)
+        self.layers.append(layer)
+        return points
@@ -0,0 +1,230 @@
+# ==========================
+# SCENE BAKE
+# A level's merged obstacle meshes and collision data (car footprints,
+# plane BVH) built once per seed and cached as a binary file:
+#
+#   b'SCN1' | u32 header length | header JSON | arrays back to back
+#
+# The header lists every array's name, typecode and length. Files are
+# keyed by seed and a hash of the code that builds them, so editing a
+# generator invalidates old bakes instead of loading stale levels.
+# The cache keeps the MAX_SCENES most recently used files; a file that
+# can't be read back is treated as a miss and baked again.
+# ==========================
+
+import argparse, hashlib, json, os, struct, tempfile
+from array import array
+from functools import lru_cache
+
+from level_layout import generate_layout, new_seed
+from mesh_data import box_mesh_data, sphere_mesh_data
+from bvh import BVH, NODE_ARRAYS
+from world_streaming import lot_barriers
+
+MAGIC = b'SCN1'
+HEADER = struct.Struct('<I')
+SOURCES = ('level_layout.py', 'mesh_data.py', 'bvh.py', 'scene_bake.py')
+CAR_OBSTACLE_HALF = 0.5
+PLANE_OBSTACLE_RADIUS = 0.5
+MAX_SCENES = 64
+
+
+def _barrier_key(barriers):
+    # barriers: (x, y, z, half x, half y, half z) lot boxes, as hashable floats
+    return tuple(tuple(float(v) for v in b) for b in barriers)
+
+
+@lru_cache(maxsize=None)
+def code_version(barriers):
+    h = hashlib.sha1()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in SOURCES:
+        with open(os.path.join(here, name), 'rb') as f:
+            h.update(f.read())
+    h.update(repr(barriers).encode())
+    return h.hexdigest()[:12]
+
+
+def _flat(code, rows):
+    return array(code, [v for row in rows for v in row])
+
+
+def _rows(values, width):
+    return list(zip(*[iter(values)] * width))
+
+
+class BakedLevel:
+    __slots__ = ('seed', 'car_obstacles', 'plane_obstacles', 'car_mesh', 'plane_mesh',
+                 'colliders', 'plane_tree')
+
+    def __init__(self, seed, arrays):
+        self.seed = seed
+        self.car_obstacles = _rows(arrays['car_obstacles'], 3)
+        self.plane_obstacles = _rows(arrays['plane_obstacles'], 3)
+        self.car_mesh = tuple(_rows(arrays['car_' + k], 3) for k in ('vertices', 'triangles', 'normals'))
+        self.plane_mesh = tuple(_rows(arrays['plane_' + k], 3) for k in ('vertices', 'triangles', 'normals'))
+        self.colliders = _rows(arrays['colliders'], 4)
+        self.plane_tree = BVH.from_arrays(_rows(arrays['spheres'], 4), _rows(arrays['boxes'], 6),
+                                          {name: arrays['bvh_' + name] for name in NODE_ARRAYS})
+
+
+# ===== Baking =====
+def bake_arrays(seed, barriers):
+    layout = generate_layout(seed)
+    h = CAR_OBSTACLE_HALF
+    spheres = [(x, y, z, PLANE_OBSTACLE_RADIUS) for x, y, z in layout.plane_obstacles]
+    car = box_mesh_data([(x, y, z, 2*h, 2*h, 2*h) for x, y, z in layout.car_obstacles])
+    plane = sphere_mesh_data(spheres)
+    tree = BVH(spheres=spheres, boxes=barriers)
+
+    arrays = {
+        'car_obstacles': _flat('d', layout.car_obstacles),
+        'plane_obstacles': _flat('d', layout.plane_obstacles),
+        'colliders': _flat('d', [(x, z, h, h) for x, _, z in layout.car_obstacles] +
+                                [(b[0], b[2], b[3], b[5]) for b in barriers]),
+        'spheres': _flat('d', spheres),
+        'boxes': _flat('d', barriers),
+    }
+    for prefix, (vertices, triangles, normals) in (('car_', car), ('plane_', plane)):
+        arrays[prefix + 'vertices'] = _flat('f', vertices)
+        arrays[prefix + 'triangles'] = _flat('I', triangles)
+        arrays[prefix + 'normals'] = _flat('f', normals)
+    for name in NODE_ARRAYS:
+        arrays['bvh_' + name] = getattr(tree, name)
+    return arrays
+
+
+def write_scene(path, seed, version, arrays):
+    header = json.dumps({'seed': seed, 'version': version,
+                         'arrays': [[name, a.typecode, len(a)] for name, a in arrays.items()]}).encode()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'wb') as f:
+        f.write(MAGIC + HEADER.pack(len(header)) + header)
+        for a in arrays.values():
+            f.write(a.tobytes())
+    os.replace(tmp, path)
+
+
+def read_scene(path):
+    # Raises ValueError for anything that isn't a complete baked scene
+    with open(path, 'rb') as f:
+        if f.read(4) != MAGIC:
+            raise ValueError(f'{path} is not a baked scene')
+        try:
+            (length,) = HEADER.unpack(f.read(HEADER.size))
+            header = json.loads(f.read(length))
+            arrays = {}
+            for name, code, count in header['arrays']:
+                a = array(code)
+                data = f.read(count * a.itemsize)
+                if len(data) != count * a.itemsize:
+                    raise ValueError(f'{path} is truncated')
+                a.frombytes(data)
+                arrays[name] = a
+        except (struct.error, KeyError, TypeError) as e:
+            raise ValueError(f'{path} is corrupt: {e!r}') from e
+    return header, arrays
+
+
+# ===== Cache =====
+def scene_path(cache_dir, seed, version):
+    return os.path.join(cache_dir, f'level-{seed:08x}-{version}.scn')
+
+
+def usable_cache(preferred):
+    # The preferred directory if it can be written to, else a per-user
+    # cache, else one under the temp dir
+    user = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    for path in (preferred, os.path.join(user, 'car-game', 'scene_cache'),
+                 os.path.join(tempfile.gettempdir(), 'car-game-scene_cache')):
+        try:
+            os.makedirs(path, exist_ok=True)
+            tempfile.TemporaryFile(dir=path).close()
+            return path
+        except OSError:
+            continue
+    return preferred
+
+
+def load_level(seed, barriers, cache_dir, keep=MAX_SCENES):
+    # Reads the baked file for this seed, baking and caching it on a miss.
+    # Hits are touched so trim() drops the least recently used files first.
+    barriers = _barrier_key(barriers)
+    version = code_version(barriers)
+    path = scene_path(cache_dir, seed, version)
+    try:
+        _, arrays = read_scene(path)
+        level = BakedLevel(seed, arrays)
+    except (OSError, ValueError, KeyError):
+        arrays = bake_arrays(seed, barriers)
+        try:
+            write_scene(path, seed, version, arrays)
+        except OSError as e:
+            print(f'[scene_bake] could not cache level {seed:08x}: {e}')
+        trim(cache_dir, keep)
+        return BakedLevel(seed, arrays)
+    try:
+        os.utime(path)
+    except OSError:
+        pass
+    return level
+
+
+def baked_seeds(cache_dir, barriers):
+    # Seeds baked by the current code, for picking levels that load from disk.
+    suffix = f'-{code_version(_barrier_key(barriers))}.scn'
+    try:
+        names = os.listdir(cache_dir)
+    except OSError:
+        return []
+    return sorted(int(n[6:14], 16) for n in names if n.startswith('level-') and n.endswith(suffix))
+
+
+def prune(cache_dir, barriers):
+    # Removes bakes left behind by older code.
+    suffix = f'-{code_version(_barrier_key(barriers))}.scn'
+    for name in os.listdir(cache_dir):
+        if name.startswith('level-') and name.endswith('.scn') and not name.endswith(suffix):
+            os.remove(os.path.join(cache_dir, name))
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0.0
+
+
+def trim(cache_dir, keep):
+    # Removes all but the `keep` most recently used bakes.
+    try:
+        names = [n for n in os.listdir(cache_dir) if n.startswith('level-') and n.endswith('.scn')]
+    except OSError:
+        return
+    paths = sorted((os.path.join(cache_dir, n) for n in names), key=_mtime, reverse=True)
+    for path in paths[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# ===== Offline bake =====
+# Barriers of the Car Game.py lot: (centre, half extents)
+LOT_BARRIERS = tuple((x, y, z, sx/2, sy/2, sz/2) for x, y, z, sx, sy, sz in lot_barriers(0, 0))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Bake Car Game levels to the scene cache')
+    parser.add_argument('seeds', nargs='*', type=int)
+    parser.add_argument('--random', type=int, default=0, help='also bake this many random seeds')
+    parser.add_argument('--cache', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scene_cache'))
+    parser.add_argument('--keep', type=int, default=MAX_SCENES, help='most levels left in the cache')
+    args = parser.parse_args()
+
+    os.makedirs(args.cache, exist_ok=True)
+    prune(args.cache, LOT_BARRIERS)
+    seeds = args.seeds + [new_seed() for _ in range(args.random)]
+    for seed in seeds:
+        load_level(seed, LOT_BARRIERS, args.cache, keep=args.keep)
+    print(f'{len(baked_seeds(args.cache, LOT_BARRIERS))} levels baked in {args.cache}')
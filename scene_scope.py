@@ -0,0 +1,55 @@
+# ==========================
+# SCENE SCOPE
+# Everything a game session creates is registered to one scope and
+# released together. In debug mode the scope also compares the live
+# entity list against what existed when it opened and reports survivors.
+# ==========================
+
+
+class SceneScope:
+    def __init__(self, name, destroy, live_entities=None, debug=False):
+        # destroy: function that tears an entity down (ursina's destroy).
+        # live_entities: callable returning every entity alive right now.
+        self.name = name
+        self._destroy = destroy
+        self._live = live_entities
+        self.debug = debug
+        self.entities = []
+        self._baseline = None
+        self._on_release = []
+
+    def open(self):
+        self.entities.clear()
+        self._on_release.clear()
+        if self.debug and self._live:
+            self._baseline = {id(e) for e in self._live()}
+        return self
+
+    def add(self, entity):
+        # Register a top-level entity; children go down with their parent.
+        self.entities.append(entity)
+        return entity
+
+    def on_release(self, callback):
+        self._on_release.append(callback)
+
+    def release(self):
+        # Runs release hooks, destroys every entity newest first and, in
+        # debug mode, returns the entities that outlived the scope.
+        for callback in self._on_release:
+            callback()
+        for entity in reversed(self.entities):
+            self._destroy(entity)
+        count = len(self.entities)
+        self.entities.clear()
+        self._on_release.clear()
+        survivors = self.survivors()
+        if survivors:
+            print(f"[{self.name}] {len(survivors)} of the scene's entities survived release "
+                  f"({count} released): {', '.join(sorted({type(e).__name__ for e in survivors}))}")
+        return survivors
+
+    def survivors(self):
+        if self._baseline is None:
+            return []
+        return [e for e in self._live() if id(e) not in self._baseline]
@@ -0,0 +1,142 @@
+# ==========================
+# TELEMETRY
+# Per-tick vehicle samples go into preallocated column arrays used as a
+# ring buffer. A background thread drains them into a columnar file:
+#
+#   b'TLM1' | u32 schema length | schema JSON | blocks...
+#   block = u32 row count | each column's values back to back
+#
+# so readers can pull single columns block by block without parsing rows.
+# ==========================
+
+import atexit, json, os, struct, threading
+from array import array
+
+MAGIC = b'TLM1'
+BLOCK_HEADER = struct.Struct('<I')
+
+COLUMNS = (
+    ('t', 'd'), ('vehicle', 'B'),
+    ('x', 'f'), ('y', 'f'), ('z', 'f'), ('heading', 'f'), ('pitch', 'f'),
+    ('vx', 'f'), ('vy', 'f'), ('vz', 'f'),
+    ('input0', 'b'), ('input1', 'b'), ('input2', 'b'),
+    ('events', 'B'),
+)
+
+VEHICLE_CAR, VEHICLE_PLANE = 0, 1
+EVENT_COLLISION, EVENT_PARKED, EVENT_LANDED, EVENT_RESET = 1, 2, 4, 8
+# Set on rows written by mark(): they repeat the previous sample's state
+# only to carry events, and aren't samples themselves.
+EVENT_MARKER = 16
+
+
+class TelemetryRecorder:
+    def __init__(self, path, capacity=1 << 16, flush_interval=1.0):
+        self.path = path
+        self.capacity = capacity
+        self.flush_interval = flush_interval
+        self.columns = [array(code, [0]) * capacity for _, code in COLUMNS]
+        (self._t, self._vehicle, self._x, self._y, self._z, self._heading, self._pitch,
+         self._vx, self._vy, self._vz, self._in0, self._in1, self._in2, self._events) = self.columns
+        self.head = 0       # rows written by the frame thread
+        self.flushed = 0    # rows handed to disk by the writer
+        self.dropped = 0
+        self._pending = 0   # events marked before the first row
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._file = open(path, 'wb')
+        schema = json.dumps({'columns': COLUMNS}).encode()
+        self._file.write(MAGIC + BLOCK_HEADER.pack(len(schema)) + schema)
+
+        self._stop = threading.Event()
+        self._writer = threading.Thread(target=self._write_loop, name='telemetry-writer', daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    # ===== Frame thread =====
+    def record(self, t, vehicle, x, y, z, heading, pitch, vx, vy, vz, in0, in1, in2, events=0):
+        i = self.head % self.capacity
+        self._t[i] = t
+        self._vehicle[i] = vehicle
+        self._x[i] = x; self._y[i] = y; self._z[i] = z
+        self._heading[i] = heading % 360
+        self._pitch[i] = pitch
+        self._vx[i] = vx; self._vy[i] = vy; self._vz[i] = vz
+        self._in0[i] = in0; self._in1[i] = in1; self._in2[i] = in2
+        self._events[i] = events | self._pending
+        self._pending = 0
+        self.head += 1
+
+    def mark(self, event):
+        # Writes an event row copying the most recent sample. Rows already
+        # recorded are never touched: the writer may have flushed them.
+        if not self.head:
+            self._pending |= event
+            return
+        last = (self.head - 1) % self.capacity
+        i = self.head % self.capacity
+        for col in self.columns:
+            col[i] = col[last]
+        self._in0[i] = self._in1[i] = self._in2[i] = 0
+        self._events[i] = event | EVENT_MARKER
+        self.head += 1
+
+    # ===== Writer thread =====
+    def _write_loop(self):
+        while not self._stop.wait(self.flush_interval):
+            self._flush()
+        self._flush()
+
+    def _flush(self):
+        head = self.head
+        start = self.flushed
+        if head - start > self.capacity:
+            # The frame thread lapped us; the oldest rows are gone.
+            self.dropped += head - start - self.capacity
+            start = head - self.capacity
+        if head == start:
+            return
+        a, b = start % self.capacity, head % self.capacity
+        out = [BLOCK_HEADER.pack(head - start)]
+        for col in self.columns:
+            if a < b:
+                out.append(col[a:b].tobytes())
+            else:
+                out.append(col[a:].tobytes())
+                out.append(col[:b].tobytes())
+        self._file.write(b''.join(out))
+        self._file.flush()
+        self.flushed = head
+
+    def close(self):
+        if self._writer.is_alive():
+            self._stop.set()
+            self._writer.join()
+        if not self._file.closed:
+            self._file.close()
+
+
+# ===== Reading =====
+def read_telemetry(path, columns=None):
+    # Yields one {name: array} dict per block; pass column names to skip the rest.
+    with open(path, 'rb') as f:
+        if f.read(4) != MAGIC:
+            raise ValueError(f'{path} is not a telemetry file')
+        (length,) = BLOCK_HEADER.unpack(f.read(BLOCK_HEADER.size))
+        schema = [tuple(c) for c in json.loads(f.read(length))['columns']]
+        wanted = set(columns) if columns else None
+        while True:
+            header = f.read(BLOCK_HEADER.size)
+            if len(header) < BLOCK_HEADER.size:
+                return
+            (rows,) = BLOCK_HEADER.unpack(header)
+            block = {}
+            for name, code in schema:
+                size = rows * array(code).itemsize
+                if wanted is not None and name not in wanted:
+                    f.seek(size, 1)
+                    continue
+                col = array(code)
+                col.frombytes(f.read(size))
+                block[name] = col
+            yield block
@@ -0,0 +1,119 @@
+# ==========================
+# TERRAIN
+# Seeded heightfield around the lot. Height and normal lookups are O(1)
+# bilinear reads from a flat array, so ground collision never needs a
+# mesh collider. Meshes are produced one chunk at a time.
+# ==========================
+
+import random
+from array import array
+from math import sqrt
+
+CHUNK_CELLS = 16
+
+
+def _smooth(t):
+    return t * t * (3 - 2*t)
+
+
+def _value_noise(rng, cols, rows, cell):
+    lattice = [[rng.random() for _ in range(cols // cell + 2)] for _ in range(rows // cell + 2)]
+
+    def sample(i, j):
+        gi, gj = i / cell, j / cell
+        i0, j0 = int(gi), int(gj)
+        fx, fz = _smooth(gi - i0), _smooth(gj - j0)
+        r0, r1 = lattice[j0], lattice[j0 + 1]
+        a = r0[i0] + (r0[i0+1] - r0[i0]) * fx
+        b = r1[i0] + (r1[i0+1] - r1[i0]) * fx
+        return a + (b - a) * fz
+    return sample
+
+
+class Heightfield:
+    def __init__(self, cols, rows, cell_size, origin_x, origin_z, heights=None):
+        self.cols, self.rows = cols, rows          # vertices along x / z
+        self.cell_size = cell_size
+        self.origin_x, self.origin_z = origin_x, origin_z
+        self.heights = heights if heights is not None else array('f', [0.0]) * (cols * rows)
+
+    @classmethod
+    def generate(cls, seed, width=400, depth=400, cell_size=2, amplitude=18,
+                 flat_half_x=17, flat_half_z=52, falloff=30):
+        # Fractal value noise, pressed flat over the lot (centred on the
+        # origin) and blended back up over `falloff` metres.
+        cols, rows = int(width / cell_size) + 1, int(depth / cell_size) + 1
+        field = cls(cols, rows, cell_size, -width/2, -depth/2)
+        rng = random.Random(seed)
+        octaves = [(_value_noise(rng, cols, rows, cell), weight)
+                   for cell, weight in ((48, 0.55), (24, 0.25), (12, 0.13), (6, 0.07))]
+        h = field.heights
+        for j in range(rows):
+            z = field.origin_z + j*cell_size
+            dz = max(0.0, abs(z) - flat_half_z)
+            for i in range(cols):
+                x = field.origin_x + i*cell_size
+                dx = max(0.0, abs(x) - flat_half_x)
+                mask = min(1.0, sqrt(dx*dx + dz*dz) / falloff)
+                if mask <= 0:
+                    continue
+                n = 0.0
+                for sample, weight in octaves:
+                    n += sample(i, j) * weight
+                h[j*cols + i] = n * amplitude * _smooth(mask)
+        return field
+
+    # ===== Queries =====
+    def _cell(self, x, z):
+        gx = (x - self.origin_x) / self.cell_size
+        gz = (z - self.origin_z) / self.cell_size
+        gx = min(max(gx, 0.0), self.cols - 1.000001)
+        gz = min(max(gz, 0.0), self.rows - 1.000001)
+        i, j = int(gx), int(gz)
+        return i, j, gx - i, gz - j
+
+    def height(self, x, z):
+        i, j, fx, fz = self._cell(x, z)
+        h, k = self.heights, j*self.cols + i
+        a = h[k] + (h[k+1] - h[k]) * fx
+        b = h[k+self.cols] + (h[k+self.cols+1] - h[k+self.cols]) * fx
+        return a + (b - a) * fz
+
+    def normal(self, x, z):
+        # Analytic gradient of the bilinear patch under (x, z).
+        i, j, fx, fz = self._cell(x, z)
+        h, k, c = self.heights, j*self.cols + i, self.cols
+        h00, h10, h01, h11 = h[k], h[k+1], h[k+c], h[k+c+1]
+        ddx = ((h10 - h00) * (1 - fz) + (h11 - h01) * fz) / self.cell_size
+        ddz = ((h01 - h00) * (1 - fx) + (h11 - h10) * fx) / self.cell_size
+        inv = 1 / sqrt(ddx*ddx + 1 + ddz*ddz)
+        return -ddx*inv, inv, -ddz*inv
+
+    # ===== Chunks =====
+    def chunk_grid(self):
+        return ((self.cols - 2) // CHUNK_CELLS + 1, (self.rows - 2) // CHUNK_CELLS + 1)
+
+    def chunk_center(self, ci, cj):
+        half = CHUNK_CELLS * self.cell_size / 2
+        return (self.origin_x + ci*CHUNK_CELLS*self.cell_size + half,
+                self.origin_z + cj*CHUNK_CELLS*self.cell_size + half)
+
+    def chunk_mesh_data(self, ci, cj):
+        # Vertices, triangles, normals and uvs for one chunk, in world space.
+        i0, j0 = ci*CHUNK_CELLS, cj*CHUNK_CELLS
+        i1, j1 = min(i0 + CHUNK_CELLS, self.cols - 1), min(j0 + CHUNK_CELLS, self.rows - 1)
+        w = i1 - i0 + 1
+        s, h = self.cell_size, self.heights
+        vertices, normals, uvs, triangles = [], [], [], []
+        for j in range(j0, j1 + 1):
+            z = self.origin_z + j*s
+            for i in range(i0, i1 + 1):
+                x = self.origin_x + i*s
+                vertices.append((x, h[j*self.cols + i], z))
+                normals.append(self.normal(x, z))
+                uvs.append((i - i0, j - j0))
+        for j in range(j1 - j0):
+            for i in range(w - 1):
+                a = j*w + i
+                triangles.extend(((a, a + w, a + w + 1), (a, a + w + 1, a + 1)))
+        return vertices, triangles, normals, uvs
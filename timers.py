@@ -0,0 +1,61 @@
+# ==========================
+# TIMERS
+# Hashed timer wheel keyed by name. Scheduling a key that is already
+# pending is a no-op (or a replace), so per-frame code can ask for "reset
+# in 2 s" every frame and still get exactly one reset.
+# ==========================
+
+from math import ceil
+
+
+class TimerWheel:
+    def __init__(self, tick=1/60, slots=512):
+        self.tick = tick
+        self.slots = [{} for _ in range(slots)]
+        self.timers = {}        # key -> slot index
+        self.now = 0            # ticks elapsed
+        self._accum = 0.0
+
+    def __len__(self):
+        return len(self.timers)
+
+    def pending(self, key):
+        return key in self.timers
+
+    def schedule(self, key, delay, callback, replace=False):
+        if key in self.timers:
+            if not replace:
+                return False
+            self.cancel(key)
+        due = self.now + max(1, ceil(delay / self.tick))
+        slot = due % len(self.slots)
+        self.slots[slot][key] = (due, callback)
+        self.timers[key] = slot
+        return True
+
+    def cancel(self, key):
+        slot = self.timers.pop(key, None)
+        if slot is None:
+            return False
+        del self.slots[slot][key]
+        return True
+
+    def clear(self):
+        for slot in set(self.timers.values()):
+            self.slots[slot].clear()
+        self.timers.clear()
+
+    def advance(self, dt):
+        self._accum += dt
+        while self._accum >= self.tick:
+            self._accum -= self.tick
+            self.now += 1
+            bucket = self.slots[self.now % len(self.slots)]
+            if not bucket:
+                continue
+            fired = [(key, cb) for key, (due, cb) in bucket.items() if due <= self.now]
+            for key, _ in fired:
+                del bucket[key]
+                del self.timers[key]
+            for _, cb in fired:
+                cb()
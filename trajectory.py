@@ -0,0 +1,51 @@
+# ==========================
+# TRAJECTORY
+# Predicted car paths for the overlay: one scratch car rolls forward with
+# the held inputs and another with full braking, side by side in a single
+# loop, into preallocated point buffers. Nothing is allocated per frame.
+# The rollout steps at the game's 60 Hz tick so it follows the same path
+# as the car; only every POINT_EVERY-th pose is kept as a point.
+# ==========================
+
+from array import array
+
+from vehicle_state import CarState
+
+HORIZON = 2.0
+STEP = 1/60
+POINT_EVERY = 2
+STOP_SPEED = 0.05
+
+
+class TrajectoryPredictor:
+    def __init__(self, horizon=HORIZON, step=STEP, point_every=POINT_EVERY):
+        self.step = step
+        self.point_every = point_every
+        self.count = int(round(horizon / (step * point_every))) + 1
+        # x, y, z per point; point 0 is the car itself
+        self.ahead = array('d', [0.0]) * (self.count * 3)
+        self.brake = array('d', [0.0]) * (self.count * 3)
+        self.stop = 0       # index of the braking stop point
+        self._held, self._braking = CarState(), CarState()
+
+    def predict(self, state, move, steer, brake):
+        a, b = self._held, self._braking
+        a.copy_from(state)
+        b.copy_from(state)
+        ahead, path, h, k = self.ahead, self.brake, self.step, self.point_every
+        stopped = False
+        for i in range(self.count):
+            o = i * 3
+            ahead[o], ahead[o+1], ahead[o+2] = a.x, a.y, a.z
+            for _ in range(k):
+                a.step(move, steer, brake, h)
+            if stopped:
+                continue
+            path[o], path[o+1], path[o+2] = b.x, b.y, b.z
+            self.stop = i
+            for _ in range(k):
+                if b.vx*b.vx + b.vz*b.vz < STOP_SPEED*STOP_SPEED:
+                    stopped = True
+                    break
+                b.step(0, steer, 1, h)
+        return self
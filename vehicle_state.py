@@ -0,0 +1,196 @@
+# ==========================
+# VEHICLE STATE
+# Slotted simulation state for the car and the plane. Every step is scalar,
+# in-place math; the Entity only gets its transform copied once per frame.
+# ==========================
+
+from math import sin, cos, sqrt, radians
+
+from geometry import orientation_axes
+
+GRAVITY = 9.8
+CAR_RIDE_HEIGHT = 0.25
+# Plane hull as (local centre, half extents) boxes: body, wings, tail.
+# Child entities inherit the body's (1, 0.3, 3) scale, hence the odd sizes.
+PLANE_HULL = (((0, 0, 0), (0.5, 0.15, 1.5)),
+              ((0, 0, 0), (3, 0.015, 0.45)),
+              ((0, 0, -3.6), (0.75, 0.015, 1.2)))
+
+
+def lerp_angle(a, b, t):
+    a %= 360
+    b %= 360
+    return a + ((b - a + 180) % 360 - 180) * t
+
+
+# ===== Car =====
+class CarState:
+    __slots__ = ('x', 'y', 'z', 'heading', 'vx', 'vy', 'vz',
+                 'target_rotation', 'rotation_velocity', 'spawn', 'px', 'py', 'pz', 'ph',
+                 'accel', 'rev_accel', 'max_speed', 'max_rev', 'friction', 'rot_speed')
+
+    def __init__(self, spawn=(0, CAR_RIDE_HEIGHT, -45)):
+        self.spawn = spawn
+        self.accel, self.rev_accel = 4, 2
+        self.max_speed, self.max_rev = 9, 4.5
+        self.friction, self.rot_speed = 6, 60
+        self.reset()
+
+    def reset(self):
+        self.x, self.y, self.z = self.spawn
+        self.heading = 0.0
+        self.vx = self.vy = self.vz = 0.0
+        self.target_rotation = 0.0
+        self.rotation_velocity = 0.0
+
+    def speed(self):
+        return sqrt(self.vx*self.vx + self.vy*self.vy + self.vz*self.vz)
+
+    def copy_from(self, other):
+        # Dynamic state and tuning only; used for scratch rollouts.
+        self.x, self.y, self.z, self.heading = other.x, other.y, other.z, other.heading
+        self.vx, self.vy, self.vz = other.vx, other.vy, other.vz
+        self.target_rotation, self.rotation_velocity = other.target_rotation, other.rotation_velocity
+        self.accel, self.rev_accel = other.accel, other.rev_accel
+        self.max_speed, self.max_rev = other.max_speed, other.max_rev
+        self.friction, self.rot_speed = other.friction, other.rot_speed
+
+    # Pose bookkeeping for swept collision (see ccd.advance)
+    def save_pose(self):
+        self.px, self.py, self.pz, self.ph = self.x, self.y, self.z, self.heading
+
+    def pose(self):
+        return self.x, self.y, self.z, self.heading
+
+    def lerp_pose(self, end, t):
+        self.x = self.px + (end[0] - self.px) * t
+        self.y = self.py + (end[1] - self.py) * t
+        self.z = self.pz + (end[2] - self.pz) * t
+        self.heading = self.ph + ((end[3] - self.ph + 180) % 360 - 180) * t
+
+    def step(self, move_input, steer_input, brake, dt):
+        a = radians(self.heading)
+        fx, fz = sin(a), cos(a)
+        speed = self.speed()
+
+        steering_eff = min(speed/self.max_speed, 1)
+        self.rotation_velocity += steer_input * self.rot_speed * steering_eff * dt
+        self.rotation_velocity -= self.rotation_velocity * 3 * dt
+        self.target_rotation += self.rotation_velocity * dt
+        self.heading = lerp_angle(self.heading, self.target_rotation, 8*dt)
+
+        if move_input == 1:
+            self.vx += fx * self.accel * dt
+            self.vz += fz * self.accel * dt
+        elif move_input == -1:
+            self.vx -= fx * self.rev_accel * dt
+            self.vz -= fz * self.rev_accel * dt
+        else:
+            k = 1 - min(self.friction*dt, 1)
+            self.vx *= k; self.vy *= k; self.vz *= k
+
+        if brake:
+            k = 1 - min(12*dt, 1)
+            self.vx *= k; self.vy *= k; self.vz *= k
+
+        if move_input == 1:
+            self._cap(self.max_speed)
+        elif move_input == -1:
+            self._cap(self.max_rev)
+
+        self.vy -= GRAVITY*dt
+        self.x += self.vx*dt
+        self.y += self.vy*dt
+        self.z += self.vz*dt
+        if self.y < CAR_RIDE_HEIGHT:
+            self.y = CAR_RIDE_HEIGHT
+            self.vy = 0.0
+
+    def _cap(self, limit):
+        speed = self.speed()
+        if speed > limit:
+            k = limit / speed
+            self.vx *= k; self.vy *= k; self.vz *= k
+
+    def sync(self, entity):
+        entity.x = self.x
+        entity.y = self.y
+        entity.z = self.z
+        entity.rotation_y = self.heading
+
+
+# ===== Plane =====
+class PlaneState:
+    __slots__ = ('x', 'y', 'z', 'pitch', 'yaw', 'vx', 'vy', 'vz', 'spawn',
+                 'px', 'py', 'pz', 'ppitch', 'pyaw', 'wx', 'wy', 'wz',
+                 'accel', 'max_speed', 'friction', 'turn_rate')
+
+    def __init__(self, spawn=(0, 5, -45)):
+        self.spawn = spawn
+        self.accel, self.max_speed, self.friction = 5, 15, 1.5
+        self.turn_rate = 30
+        self.reset()
+
+    def reset(self):
+        self.x, self.y, self.z = self.spawn
+        self.pitch = self.yaw = 0.0
+        self.vx = self.vy = self.vz = 0.0
+        self.wx = self.wy = self.wz = 0.0
+
+    def speed(self):
+        # Airspeed; the ground track also carries the wind
+        return sqrt(self.vx*self.vx + self.vy*self.vy + self.vz*self.vz)
+
+    def wind_speed(self):
+        return sqrt(self.wx*self.wx + self.wy*self.wy + self.wz*self.wz)
+
+    def save_pose(self):
+        self.px, self.py, self.pz, self.ppitch, self.pyaw = self.x, self.y, self.z, self.pitch, self.yaw
+
+    def pose(self):
+        return self.x, self.y, self.z, self.pitch, self.yaw
+
+    def lerp_pose(self, end, t):
+        self.x = self.px + (end[0] - self.px) * t
+        self.y = self.py + (end[1] - self.py) * t
+        self.z = self.pz + (end[2] - self.pz) * t
+        self.pitch = self.ppitch + (end[3] - self.ppitch) * t
+        self.yaw = self.pyaw + (end[4] - self.pyaw) * t
+
+    def step(self, throttle, pitch_input, yaw_input, dt):
+        p, h = radians(self.pitch), radians(self.yaw)
+        cp = cos(p)
+        if throttle != 0:
+            k = self.accel * throttle * dt
+            self.vx += sin(h)*cp * k
+            self.vy -= sin(p) * k
+            self.vz += cos(h)*cp * k
+        else:
+            k = 1 - min(self.friction*dt, 1)
+            self.vx *= k; self.vy *= k; self.vz *= k
+        speed = self.speed()
+        if speed > self.max_speed:
+            k = self.max_speed / speed
+            self.vx *= k; self.vy *= k; self.vz *= k
+
+        self.pitch += pitch_input * self.turn_rate * dt
+        self.yaw += yaw_input * self.turn_rate * dt
+
+        self.x += (self.vx + self.wx)*dt
+        self.y += (self.vy + self.wy)*dt
+        self.z += (self.vz + self.wz)*dt
+
+    def hull(self):
+        # World-space oriented boxes of PLANE_HULL for the current pose.
+        axes = orientation_axes(self.pitch, self.yaw)
+        (rx, ry, rz), (ux, uy, uz), (fx, fy, fz) = axes
+        return [((self.x + ox*rx + oy*ux + oz*fx, self.y + ox*ry + oy*uy + oz*fy,
+                  self.z + ox*rz + oy*uz + oz*fz), axes, half)
+                for (ox, oy, oz), half in PLANE_HULL]
+
+    def sync(self, entity):
+        entity.x = self.x
+        entity.y = self.y
+        entity.z = self.z
+        entity.rotation_x = self.pitch
+        entity.rotation_y = self.yaw
@@ -0,0 +1,107 @@
+# ==========================
+# WIND
+# Per-level plane-mode atmosphere: a prevailing breeze that builds up with
+# height above the terrain, plus turbulence from a periodic 3D grid of
+# smoothed noise vectors. The turbulence is carried along by the breeze,
+# so gusts sweep across the level over time. Sampling is trilinear
+# interpolation: plain math for the one plane sampled each tick, NumPy
+# for batches of points.
+# ==========================
+
+from math import floor
+
+import numpy as np
+
+GRID_SIZE = (16, 6, 16)     # cells along x, y, z; x and z wrap around
+CELL_SIZE = 6.0
+BREEZE = (1.0, 3.0)         # prevailing speed range at full height
+TURBULENCE = 1.2            # RMS gust speed at full height
+VERTICAL_SHARE = 0.4        # vertical gusts are weaker than horizontal ones
+CALM_HEIGHT = 12.0          # wind ramps up linearly from the ground to this height above it
+
+
+def _smoothed_noise(rng, size, passes=3):
+    # White noise vectors blurred with a wrapping box filter, then
+    # rescaled to unit RMS per component.
+    grid = rng.standard_normal(size + (3,))
+    for _ in range(passes):
+        for axis in range(3):
+            grid = (np.roll(grid, 1, axis) + grid + np.roll(grid, -1, axis)) / 3
+    return grid / grid.std(axis=(0, 1, 2))
+
+
+class WindField:
+    def __init__(self, seed, ground=None, size=GRID_SIZE, cell=CELL_SIZE, breeze=BREEZE,
+                 turbulence=TURBULENCE, calm_height=CALM_HEIGHT):
+        # ground(x, z): terrain height the wind is measured from (flat at 0 if None)
+        rng = np.random.default_rng(seed)
+        a, speed = rng.uniform(0, 2*np.pi), rng.uniform(*breeze)
+        self.mean = np.array([np.sin(a)*speed, 0.0, np.cos(a)*speed])
+        self.ground = ground
+        self.cell = cell
+        self.calm_height = calm_height
+        self.size = size
+        grid = _smoothed_noise(rng, size) * turbulence
+        grid[..., 1] *= VERTICAL_SHARE
+        self.grid = grid
+        # Same data for the scalar path: Python floats, cell (i, j, k) at (i*ny + j)*nz + k
+        self._mean = tuple(self.mean.tolist())
+        self._cells = [tuple(v) for v in grid.reshape(-1, 3).tolist()]
+
+    def sample(self, x, y, z, t=0.0):
+        # Wind at one point at time t as a (wx, wy, wz) tuple
+        h = y - self.ground(x, z) if self.ground else y
+        if h <= 0:
+            return 0.0, 0.0, 0.0
+        nx, ny, nz = self.size
+        mx, my, mz = self._mean
+        gx = (x - mx*t) / self.cell
+        gy = min(h / self.cell, ny - 1.000001)
+        gz = (z - mz*t) / self.cell
+        i, k = floor(gx), floor(gz)
+        j = int(gy)
+        fx, fy, fz = gx - i, gy - j, gz - k
+        i0, k0 = i % nx, k % nz
+        i1, k1 = (i0 + 1) % nx, (k0 + 1) % nz
+        a, b = (i0*ny + j)*nz, (i1*ny + j)*nz
+
+        g = self._cells
+        corners = (g[a+k0], g[b+k0], g[a+nz+k0], g[b+nz+k0],
+                   g[a+k1], g[b+k1], g[a+nz+k1], g[b+nz+k1])
+        ex, ey, ez = 1 - fx, 1 - fy, 1 - fz
+        weights = (ex*ey*ez, fx*ey*ez, ex*fy*ez, fx*fy*ez,
+                   ex*ey*fz, fx*ey*fz, ex*fy*fz, fx*fy*fz)
+        wx = wy = wz = 0.0
+        for w, (cx, cy, cz) in zip(weights, corners):
+            wx += w*cx
+            wy += w*cy
+            wz += w*cz
+
+        ramp = min(h / self.calm_height, 1.0)
+        return (mx + wx) * ramp, (my + wy) * ramp, (mz + wz) * ramp
+
+    def sample_many(self, x, y, z, t=0.0, ground=0.0):
+        # Wind at the given points (equal-shaped arrays) at time t, with
+        # ground the terrain height under each; returns shape (..., 3).
+        x, z = np.asarray(x, float), np.asarray(z, float)
+        h = np.asarray(y, float) - ground
+        nx, ny, nz = self.size
+        gx = (x - self.mean[0]*t) / self.cell
+        gy = np.clip(h / self.cell, 0, ny - 1.000001)
+        gz = (z - self.mean[2]*t) / self.cell
+        i, j, k = np.floor(gx), np.floor(gy), np.floor(gz)
+        fx, fy, fz = (gx - i)[..., None], (gy - j)[..., None], (gz - k)[..., None]
+        i0, j0, k0 = i.astype(int) % nx, j.astype(int), k.astype(int) % nz
+        i1, j1, k1 = (i0 + 1) % nx, j0 + 1, (k0 + 1) % nz
+
+        g = self.grid
+        c00 = g[i0, j0, k0] + (g[i1, j0, k0] - g[i0, j0, k0]) * fx
+        c10 = g[i0, j1, k0] + (g[i1, j1, k0] - g[i0, j1, k0]) * fx
+        c01 = g[i0, j0, k1] + (g[i1, j0, k1] - g[i0, j0, k1]) * fx
+        c11 = g[i0, j1, k1] + (g[i1, j1, k1] - g[i0, j1, k1]) * fx
+        c0 = c00 + (c10 - c00) * fy
+        c1 = c01 + (c11 - c01) * fy
+        gust = c0 + (c1 - c0) * fz
+
+        ramp = np.clip(h / self.calm_height, 0, 1)[..., None]
+        return (self.mean + gust) * ramp
@@ -0,0 +1,214 @@
+# ==========================
+# WORLD STREAMING
+# A city map made of lot-sized chunks. Chunk contents (layout, merged
+# obstacle mesh, car collider and plane BVH) are built on a worker thread;
+# the frame thread only turns finished data into entities, a few per
+# frame, and tears down chunks that fall out of range or over the memory
+# budget. Lot barriers have gates so the car can drive from lot to lot.
+# ==========================
+
+import queue, threading
+
+from level_layout import generate_layout
+from mesh_data import box_mesh_data
+from ccd import CarCollider
+from bvh import BVH
+
+LOT_WIDTH, LOT_DEPTH = 30, 100
+BARRIER_HEIGHT = 3
+BARRIER_THICKNESS = 1
+GATE_WIDTH = 6
+SIDE_GATES = (0,)           # z offsets of the gates in the left / right barriers
+FRONT_GATES = (-10, 10)     # x offsets of the gates in the front barrier
+CAR_HALF_WIDTH, CAR_HALF_LENGTH = 0.5, 1.0
+# Rough resident cost of a built chunk, used for the memory budget
+BYTES_PER_VERTEX, BYTES_PER_TRIANGLE = 120, 60
+
+
+def chunk_seed(world_seed, ci, cj):
+    return (world_seed * 73856093 ^ ci * 19349663 ^ cj * 83492791) & 0xffffffff
+
+
+def _segments(lo, hi, gates):
+    # (centre, length) of the stretches of [lo, hi] between gates.
+    out, start = [], lo
+    for g in sorted(gates):
+        out.append(((start + g - GATE_WIDTH/2) / 2, g - GATE_WIDTH/2 - start))
+        start = g + GATE_WIDTH/2
+    out.append(((start + hi) / 2, hi - start))
+    return out
+
+
+def lot_barriers(cx, cz):
+    # Left, right and front barriers of the lot centred on (cx, cz) as
+    # (centre, size) boxes; the back is open and every side has gates.
+    y, t, h = BARRIER_HEIGHT/2, BARRIER_THICKNESS, BARRIER_HEIGHT
+    boxes = []
+    for side in (-1, 1):
+        boxes += [(cx + side*LOT_WIDTH/2, y, cz + z, t, h, length)
+                  for z, length in _segments(-LOT_DEPTH/2, LOT_DEPTH/2, SIDE_GATES)]
+    boxes += [(cx + x, y, cz + LOT_DEPTH/2, length, h, t)
+              for x, length in _segments(-LOT_WIDTH/2, LOT_WIDTH/2, FRONT_GATES)]
+    return boxes
+
+
+class LotChunk:
+    __slots__ = ('key', 'seed', 'cx', 'cz', 'boxes', 'vertices', 'triangles', 'normals',
+                 'parking_spot', 'collider', 'tree', 'nbytes')
+
+    def __init__(self, key, seed, cx, cz, boxes, vertices, triangles, normals, parking_spot):
+        self.key, self.seed = key, seed
+        self.cx, self.cz = cx, cz
+        self.boxes = boxes
+        self.vertices, self.triangles, self.normals = vertices, triangles, normals
+        self.parking_spot = parking_spot
+        # Same boxes as half extents: ground footprints for the car, 3D for the plane
+        self.collider = CarCollider([(x, z, sx/2, sz/2) for x, _, z, sx, _, sz in boxes],
+                                    CAR_HALF_WIDTH, CAR_HALF_LENGTH)
+        self.tree = BVH(boxes=[(x, y, z, sx/2, sy/2, sz/2) for x, y, z, sx, sy, sz in boxes])
+        self.nbytes = len(vertices)*BYTES_PER_VERTEX + len(triangles)*BYTES_PER_TRIANGLE
+
+
+def build_lot_chunk(key, seed):
+    # Runs on the worker thread: no ursina calls in here.
+    ci, cj = key
+    cx, cz = ci*LOT_WIDTH, cj*LOT_DEPTH
+    layout = generate_layout(seed)
+    boxes = [(cx + x, y, cz + z, 1, 1, 1) for x, y, z in layout.car_obstacles]
+    boxes += lot_barriers(cx, cz)
+    vertices, triangles, normals = box_mesh_data(boxes, offset=(cx, 0, cz))
+    return LotChunk(key, seed, cx, cz, boxes, vertices, triangles, normals, (cx, cz + 45))
+
+
+class WorldStreamer:
+    def __init__(self, world_seed, spawn_chunk, destroy_chunk, build=build_lot_chunk,
+                 load_radius=120, unload_radius=170, max_chunks=12, max_bytes=8 << 20,
+                 spawns_per_frame=1, skip=(), extent=None):
+        # extent: (ni, nj) limits the city to lots with |ci| <= ni, |cj| <= nj
+        self.world_seed = world_seed
+        self.spawn_chunk, self.destroy_chunk, self.build = spawn_chunk, destroy_chunk, build
+        self.load_radius, self.unload_radius = load_radius, unload_radius
+        self.max_chunks, self.max_bytes = max_chunks, max_bytes
+        self.spawns_per_frame = spawns_per_frame
+        self.skip = set(skip)
+        self.extent = extent
+
+        self.loaded = {}        # key -> (LotChunk, handle)
+        self.pending = set()
+        self.refused = set()    # didn't fit the budget; retried once something unloads
+        self.resident_bytes = 0
+        self._jobs = queue.SimpleQueue()
+        self._done = queue.SimpleQueue()
+        self._worker = threading.Thread(target=self._build_loop, name='world-streamer', daemon=True)
+        self._worker.start()
+
+    # ===== Worker thread =====
+    def _build_loop(self):
+        while True:
+            key = self._jobs.get()
+            if key is None:
+                return
+            self._done.put(self.build(key, chunk_seed(self.world_seed, *key)))
+
+    # ===== Frame thread =====
+    def _in_city(self, i, j):
+        return self.extent is None or (abs(i) <= self.extent[0] and abs(j) <= self.extent[1])
+
+    def _distance2(self, key, x, z):
+        # Squared distance from (x, z) to the lot rectangle.
+        cx, cz = key[0]*LOT_WIDTH, key[1]*LOT_DEPTH
+        dx = max(abs(x - cx) - LOT_WIDTH/2, 0)
+        dz = max(abs(z - cz) - LOT_DEPTH/2, 0)
+        return dx*dx + dz*dz
+
+    def update(self, x, z):
+        for key in [k for k in self.loaded if self._distance2(k, x, z) > self.unload_radius**2]:
+            self._unload(key)
+
+        # Only the nearest max_chunks lots in range are ever requested.
+        ci, cj = round(x / LOT_WIDTH), round(z / LOT_DEPTH)
+        ri, rj = int(self.load_radius // LOT_WIDTH) + 1, int(self.load_radius // LOT_DEPTH) + 1
+        candidates = []
+        for i in range(ci - ri, ci + ri + 1):
+            for j in range(cj - rj, cj + rj + 1):
+                d = self._distance2((i, j), x, z)
+                if d <= self.load_radius**2 and (i, j) not in self.skip and self._in_city(i, j):
+                    candidates.append((d, (i, j)))
+        candidates.sort()
+        for _, key in candidates[:self.max_chunks]:
+            if key not in self.loaded and key not in self.pending and key not in self.refused:
+                self.pending.add(key)
+                self._jobs.put(key)
+
+        for _ in range(self.spawns_per_frame):
+            try:
+                chunk = self._done.get_nowait()
+            except queue.Empty:
+                break
+            self.pending.discard(chunk.key)
+            d = self._distance2(chunk.key, x, z)
+            if d > self.load_radius**2:
+                continue
+            if not self._make_room(chunk, d, x, z):
+                self.refused.add(chunk.key)
+                continue
+            self.loaded[chunk.key] = (chunk, self.spawn_chunk(chunk))
+            self.resident_bytes += chunk.nbytes
+
+    def _make_room(self, chunk, d, x, z):
+        # Evict farther chunks until the new one fits; refuse if it would
+        # have to push out something nearer than itself.
+        while len(self.loaded) >= self.max_chunks or self.resident_bytes + chunk.nbytes > self.max_bytes:
+            if not self.loaded:
+                return False
+            far = max(self.loaded, key=lambda k: self._distance2(k, x, z))
+            if self._distance2(far, x, z) <= d:
+                return False
+            self._unload(far)
+        return True
+
+    def _unload(self, key):
+        chunk, handle = self.loaded.pop(key)
+        self.resident_bytes -= chunk.nbytes
+        self.refused.clear()
+        self.destroy_chunk(handle)
+
+    def chunks(self):
+        return [chunk for chunk, _ in self.loaded.values()]
+
+    # ===== Collision =====
+    def _near(self, x, z, margin):
+        for chunk, _ in self.loaded.values():
+            if abs(x - chunk.cx) <= LOT_WIDTH/2 + margin and abs(z - chunk.cz) <= LOT_DEPTH/2 + margin:
+                yield chunk
+
+    def car_hit(self, state):
+        # Index of a streamed box under the car footprint, or -1. Only lots
+        # the car is in or next to the edge of are tested.
+        for chunk in self._near(state.x, state.z, CAR_HALF_LENGTH + BARRIER_THICKNESS):
+            index = chunk.collider.hit(state)
+            if index >= 0:
+                return index
+        return -1
+
+    def plane_hit(self, x, z, hull, reach):
+        for chunk in self._near(x, z, reach):
+            index = chunk.tree.query_hull(hull)
+            if index >= 0:
+                return index
+        return -1
+
+    def raycast(self, ox, oy, oz, dx, dy, dz, t_max):
+        # Nearest hit on a streamed lot's boxes within t_max, or -1; same
+        # signature as BVH.raycast so the camera can cast against both.
+        best = -1
+        for chunk in self._near(ox, oz, t_max):
+            t = chunk.tree.raycast(ox, oy, oz, dx, dy, dz, best if best >= 0 else t_max)
+            if t >= 0:
+                best = t
+        return best
+
+    def close(self):
+        for key in list(self.loaded):
+            self._unload(key)
+        self._jobs.put(None)